@@ -10,5 +10,10 @@ echo "Starting Telegram bot..."
 python -m src.tele_bot.bot &
 
 echo "Starting FastAPI application..."
-# Start FastAPI with Uvicorn
-exec uvicorn src.api:app --host 0.0.0.0 --port 7860 --workers 1
+if [ "${WEB_WORKERS:-1}" -gt 1 ]; then
+    # Preload the index in the master and fork workers that share its pages
+    exec gunicorn src.api:app -c gunicorn.conf.py
+else
+    # Start FastAPI with Uvicorn
+    exec uvicorn src.api:app --host 0.0.0.0 --port 7860 --workers 1
+fi
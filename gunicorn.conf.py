@@ -0,0 +1,15 @@
+# Multi-worker deployment: the app is imported and the embedding model and
+# FAISS index are loaded once in the master, then shared by forked workers.
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '7860')}"
+workers = int(os.getenv("WEB_WORKERS", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 120
+
+
+def on_starting(server):
+    from src.llm.core.registry import registry
+    registry.preload()
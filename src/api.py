@@ -8,9 +8,19 @@ import asyncio
 import uvicorn
 from multiprocessing import Process
 
+from contextlib import asynccontextmanager
+
 from src.llm.routes import router as conversation_router
 from src.llm.core.config import settings
-from src.llm.agents.conversation_agent import ConversationAgent
+from src.llm.core.registry import registry
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load models, the FAISS index and the Redis pool once, before serving
+    await asyncio.to_thread(registry.warmup)
+    yield
+    await registry.shutdown()
 
 
 app = FastAPI(
@@ -21,6 +31,7 @@ app = FastAPI(
     redoc_url="/redoc",
     openapi_url="/openapi.json",
     debug=True,
+    lifespan=lifespan,
 )
 
 
@@ -37,9 +48,8 @@ async def health():
 
     # ── Redis check ─────────────────────────────────────────────────────
     try:
-        import redis as redis_lib
-        r = redis_lib.from_url(settings.effective_redis_url, socket_connect_timeout=3)
-        r.ping()
+        # Through the shared pool rather than a fresh connection per probe
+        await asyncio.wait_for(registry.redis.async_client.ping(), timeout=3)
         status["redis"] = "ok"
     except Exception as exc:
         status["redis"] = f"error: {exc}"
@@ -63,6 +73,11 @@ async def health():
         status_code=200 if all_ok else 503,
     )
 
+@app.get("/metrics")
+async def metrics():
+    """Process-local performance counters"""
+    return registry.metrics()
+
 def ping_server():
     try:
         print("Pinging server")
@@ -1,23 +1,36 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Awaitable, Dict, Optional
+import asyncio
 import logging
+import time
+from src.llm.core.config import settings
 from src.llm.core.llm import TheryLLM
+from src.llm.core.registry import registry
 from src.llm.utils.logging import TheryBotLogger
 from src.llm.memory.history import RedisHistory
 from src.llm.memory.session_manager import SessionManager
 
 class BaseAgent(ABC):
+    # Shared pool for the synchronous fan-out; only the calling thread ever
+    # waits on these futures, so nested stages cannot starve the pool
+    _stage_executor = ThreadPoolExecutor(
+        max_workers=settings.STAGE_EXECUTOR_WORKERS,
+        thread_name_prefix="thery-stage"
+    )
+
     def __init__(
         self,
         llm: Optional[TheryLLM] = None,
         history: Optional[RedisHistory] = None,
         session_manager: Optional[SessionManager] = None
     ):
-        self.llm = llm or TheryLLM()
+        # Anything not injected comes from the process-wide registry
+        self.llm = llm or registry.llm
         self.logger = TheryBotLogger()
-        self.history = history or RedisHistory()
-        self.memory_manager = session_manager or SessionManager()
+        self.history = history or registry.history
+        self.session_manager = session_manager or registry.session_manager
     
     @abstractmethod
     def process(self, *args, **kwargs) -> Any:
@@ -64,4 +77,49 @@ class BaseAgent(ABC):
                 level=level
             )
         else:
-            print(f"Logging failed: {log_data}")
\ No newline at end of file
+            print(f"Logging failed: {log_data}")
+
+    async def _run_stage(
+        self,
+        stage: str,
+        awaitable: Awaitable[Any],
+        timeout: float,
+        default: Any
+    ) -> Any:
+        """Await a pipeline stage, degrading to `default` on timeout or error."""
+        try:
+            return await asyncio.wait_for(awaitable, timeout=timeout)
+        except asyncio.TimeoutError:
+            self._log_action(action="stage_timeout", metadata={"stage": stage, "timeout": timeout}, level=logging.WARNING)
+        except Exception as e:
+            self._log_action(action="stage_error", metadata={"stage": stage, "error": str(e)}, level=logging.ERROR)
+        return default
+
+    def _submit_stage(self, fn, *args) -> Future:
+        return self._stage_executor.submit(fn, *args)
+
+    def _stage_result(
+        self,
+        stage: str,
+        future: Future,
+        timeout: float,
+        default: Any,
+        started: Optional[float] = None
+    ) -> Any:
+        """
+        Synchronous counterpart of `_run_stage` for executor futures.
+
+        `started` is the time.monotonic() at which the stage was submitted;
+        the timeout runs from then rather than from when the caller gets
+        round to waiting, so waiting on stages in turn never stacks them.
+        """
+        if started is not None:
+            timeout = max(0.0, started + timeout - time.monotonic())
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            self._log_action(action="stage_timeout", metadata={"stage": stage, "timeout": timeout}, level=logging.WARNING)
+        except Exception as e:
+            self._log_action(action="stage_error", metadata={"stage": stage, "error": str(e)}, level=logging.ERROR)
+        return default
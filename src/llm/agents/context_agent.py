@@ -1,47 +1,50 @@
 import os
+import time
 import asyncio
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Union
 from .base_agent import BaseAgent
 from src.llm.core.config import settings
+from src.llm.core.registry import registry
 from src.llm.memory.vector_store import FAISSVectorSearch
+from src.llm.memory.partitioned_store import PartitionedVectorSearch
 from src.llm.models.schemas import ContextInfo
-try:
-    from langchain_tavily import TavilySearch as _TavilyBackend
-    _TAVILY_NEW = True
-except ImportError:
-    from langchain_community.tools.tavily_search import TavilySearchResults as _TavilyBackend  # type: ignore
-    from langchain_community.utilities.tavily_search import TavilySearchAPIWrapper  # type: ignore
-    _TAVILY_NEW = False
+from tavily import AsyncTavilyClient, TavilyClient
 
 class ContextAgent(BaseAgent):
-    def __init__(self, *args, **kwargs):
+    def __init__(
+        self,
+        *args,
+        vector_search: Optional[Union[FAISSVectorSearch, PartitionedVectorSearch]] = None,
+        **kwargs
+    ):
         super().__init__(*args, **kwargs)
-        self._initialize_tools()
+        self._initialize_tools(vector_search)
 
-    def _initialize_tools(self) -> None:
+    def _initialize_tools(
+        self,
+        vector_search: Optional[Union[FAISSVectorSearch, PartitionedVectorSearch]] = None
+    ) -> None:
         """Lazy-load expensive resources"""
-        if _TAVILY_NEW:
-            self.web_search = _TavilyBackend(
-                max_results=settings.TAVILY_MAX_RESULTS,
-                include_answer=settings.TAVILY_INCLUDE_ANSWER,
-                include_images=settings.TAVILY_INCLUDE_IMAGES,
-                tavily_api_key=settings.TAVILY_API_KEY,
-            )
-        else:
-            self.web_search = _TavilyBackend(
-                max_results=settings.TAVILY_MAX_RESULTS,
-                include_answer=settings.TAVILY_INCLUDE_ANSWER,
-                include_images=settings.TAVILY_INCLUDE_IMAGES,
-                api_wrapper=TavilySearchAPIWrapper(tavily_api_key=settings.TAVILY_API_KEY),
-            )
+        # The client's own HTTP timeout, so a hung request frees its stage
+        # worker rather than outliving the stage deadline
+        self.web_search = TavilyClient(api_key=settings.TAVILY_API_KEY)
+        self.async_web_search = AsyncTavilyClient(api_key=settings.TAVILY_API_KEY)
         
-        self.vector_search = FAISSVectorSearch()
+        # The FAISS index and its embedding model are shared process-wide
+        self.vector_search = vector_search or registry.vector_search
 
-    def process(self, query: str) -> ContextInfo:
-        """Gather context from multiple sources"""
-        web_context = self._get_web_context(query)
-        vector_context = self._get_vector_context(query)
+    def process(self, query: str, filters: Optional[Dict[str, Any]] = None) -> ContextInfo:
+        """
+        Gather context from multiple sources concurrently; `filters` restricts
+        vector search by chunk metadata, e.g. {"topic": "anxiety"}
+        """
+        started = time.monotonic()
+        web_future = self._submit_stage(self._get_web_context, query)
+        vector_future = self._submit_stage(self._get_vector_context, query, filters)
+
+        web_context = self._stage_result("web_search", web_future, settings.WEB_SEARCH_TIMEOUT, "", started)
+        vector_context = self._stage_result("vector_search", vector_future, settings.VECTOR_SEARCH_TIMEOUT, [], started)
 
         combined_context = web_context + "\n\n" + "\n".join(vector_context)
 
@@ -55,34 +58,51 @@ class ContextAgent(BaseAgent):
     
     def _get_web_context(self, query: str) -> str:
         try:
-            results = self.web_search.invoke(query)
-            return "\n".join([res["content"] for res in results])
+            results = self.web_search.search(query, **self._web_search_options())
+            return self._format_web_results(results)
         except Exception as e:
             self._log_action(action="web_search_error", metadata={"error": str(e)}, level=logging.ERROR)
             return "Web search unavailable"
     
-    def _get_vector_context(self, query: str) -> list:
+    def _get_vector_context(self, query: str, filters: Optional[Dict[str, Any]] = None) -> list:
         try:
-            return self.vector_search.search(query)
+            return self.vector_search.search(query, filters=filters)
         except Exception as e:
             self._log_action(action="vector_search_error", metadata={"error": str(e)}, level=logging.ERROR)
             return []
 
+    def _web_search_options(self) -> Dict[str, Any]:
+        return {
+            "max_results": settings.TAVILY_MAX_RESULTS,
+            "include_answer": settings.TAVILY_INCLUDE_ANSWER,
+            "include_images": settings.TAVILY_INCLUDE_IMAGES,
+            "timeout": settings.WEB_SEARCH_TIMEOUT,
+        }
+
+    def _format_web_results(self, results: Any) -> str:
+        # The client returns a dict with a "results" list
+        if isinstance(results, dict):
+            results = results.get("results", [])
+        return "\n".join([res["content"] for res in results])
 
-    # Updated async web search handling
     async def _get_web_context_async(self, query: str) -> str:
-        """Async version of web context retrieval"""
+        """Async version of web context retrieval using the async client"""
         try:
-            results = await asyncio.to_thread(self.web_search.invoke, query)
-            return "\n".join([res["content"] for res in results])
+            results = await self.async_web_search.search(query, **self._web_search_options())
+            return self._format_web_results(results)
         except Exception as e:
             self._log_action(action="web_search_error", metadata={"error": str(e)}, level=logging.ERROR)
             return "Web search unavailable"
 
-    async def process_async(self, query: str) -> ContextInfo:
+    async def process_async(self, query: str, filters: Optional[Dict[str, Any]] = None) -> ContextInfo:
         """Async version with parallel context gathering"""
-        web_task = self._get_web_context_async(query)
-        vector_task = asyncio.to_thread(self._get_vector_context, query)
+        web_task = self._run_stage(
+            "web_search", self._get_web_context_async(query), settings.WEB_SEARCH_TIMEOUT, ""
+        )
+        # FAISS search is CPU-bound, so it stays on a worker thread
+        vector_task = self._run_stage(
+            "vector_search", asyncio.to_thread(self._get_vector_context, query, filters), settings.VECTOR_SEARCH_TIMEOUT, []
+        )
 
         web_context, vector_context = await asyncio.gather(web_task, vector_task)
 
@@ -94,4 +114,4 @@ class ContextAgent(BaseAgent):
             web_context=web_context,
             vector_context=vector_context,
             combined_context=combined_context,
-        )
\ No newline at end of file
+        )
@@ -1,26 +1,46 @@
+import time
 import uuid
 import textwrap
 import logging
 import asyncio
-from typing import Dict, Any, Optional, List
+from dataclasses import dataclass
+from typing import Optional, Set, Tuple, AsyncIterator, Union
 from src.llm.agents.base_agent import BaseAgent
+from src.llm.core.config import settings
+from src.llm.core.registry import registry
 from src.llm.agents.emotion_agent import EmotionAgent
 from src.llm.agents.context_agent import ContextAgent
-from src.llm.models.schemas import ConversationResponse, EmotionalAnalysis, ContextInfo
+from src.llm.agents.summary_agent import SummaryAgent
+from src.llm.models.schemas import ConversationResponse, EmotionalAnalysis, ContextInfo, TherapistTurn
 from src.llm.models.schemas import SessionData
 from src.llm.memory.memory_manager import RedisMemoryManager
-from src.llm.memory.session_manager import SessionManager
-from src.llm.memory.history import RedisHistory
+
+@dataclass
+class TurnState:
+    """Everything gathered for a single turn before the reply is generated"""
+    query: str
+    chat_id: str
+    user_id: str
+    session_id: str
+    is_new_user: bool
+    is_new_session: bool
+    emotion_analysis: Optional[EmotionalAnalysis]
+    context: ContextInfo
+    history_context: str
+
 
 class ConversationAgent(BaseAgent):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, memory_manager: Optional[RedisMemoryManager] = None, **kwargs):
         super().__init__(*args, **kwargs)
-        # memory/session helpers (history already set by BaseAgent)
-        self.memory_manager = RedisMemoryManager()
-        self.session_manager = SessionManager()
-        # sub-agents share the same llm and history instances
-        self.emotion_agent = EmotionAgent(llm=self.llm, history=self.history)
-        self.context_agent = ContextAgent(llm=self.llm, history=self.history)
+        # llm, history and session_manager already set by BaseAgent
+        self.memory_manager = memory_manager or registry.memory_manager
+        # sub-agents share the same llm, history and session instances
+        shared = dict(llm=self.llm, history=self.history, session_manager=self.session_manager)
+        self.emotion_agent = EmotionAgent(**shared)
+        self.context_agent = ContextAgent(**shared)
+        self.summary_agent = SummaryAgent(**shared)
+        # Background stores of interrupted streams; the loop only keeps weak references
+        self._tasks: Set[asyncio.Task] = set()
     
     def process(
         self,
@@ -28,75 +48,286 @@ class ConversationAgent(BaseAgent):
         session_data: Optional[SessionData] = None
     ) -> ConversationResponse:
         """Process user query with emotional awareness and context"""
-        # Generate or validate IDs
-        if session_data:
-            user_id = self.session_manager.validate_session(session_data.session_id)
-            if user_id:
-                # Existing valid session
-                session_id = session_data.session_id
-                is_new_session = False
-            else:
-                # Expired session, create new
-                user_id, session_id = self.session_manager.generate_ids(session_data.user_id)
-                is_new_session = True
+        if settings.SINGLE_SHOT_MODE:
+            turn = self._prepare_turn(query, session_data, analyze_emotion=False)
+            fused = self._generate_fused(turn)
+            if fused:
+                turn.emotion_analysis = fused.emotion_analysis
+                return self._complete_turn(turn, fused.response.strip())
+            # Fall back to the two-call path
+            turn.emotion_analysis = self._stage_result(
+                "emotion",
+                self._submit_stage(self.emotion_agent.process, query),
+                settings.EMOTION_STAGE_TIMEOUT,
+                self._fallback_emotion_analysis()
+            )
         else:
-            # New conversation
-            user_id, session_id = self.session_manager.generate_ids()
-            is_new_session = True
+            turn = self._prepare_turn(query, session_data)
 
-        chat_id = str(uuid.uuid4())
-        # Analyze emotion
-        emotion_analysis = self.emotion_agent.process(query)
-        
-        # Gather context
-        context = self.context_agent.process(query)
-        context = ContextInfo(
-            query=context.query,
-            web_context=context.web_context,
-            vector_context=context.vector_context,
-            combined_context=context.combined_context
-        )
-
-        history_context= self.history.get_full_context(session_id)
-        
-        combined_context = context.combined_context if context else None
-        
         # Generate response
         response = self._generate_response(
             query=query,
+            emotion_analysis=turn.emotion_analysis,
+            context=turn.context.combined_context,
+            chat_history=turn.history_context
+        )
+
+        return self._complete_turn(turn, response)
+
+    async def process_async(
+        self,
+        query: str,
+        session_data: Optional[SessionData] = None
+    ) -> ConversationResponse:
+        """Async version of process that never blocks an executor thread on I/O"""
+        if settings.SINGLE_SHOT_MODE:
+            turn = await self._prepare_turn_async(query, session_data, analyze_emotion=False)
+            fused = await self._generate_fused_async(turn)
+            if fused:
+                turn.emotion_analysis = fused.emotion_analysis
+                return await self._complete_turn_async(turn, fused.response.strip())
+            # Fall back to the two-call path
+            turn.emotion_analysis = await self._run_stage(
+                "emotion",
+                self.emotion_agent.process_async(query),
+                settings.EMOTION_STAGE_TIMEOUT,
+                self._fallback_emotion_analysis()
+            )
+        else:
+            turn = await self._prepare_turn_async(query, session_data)
+
+        response = await self._generate_response_async(
+            query=query,
+            emotion_analysis=turn.emotion_analysis,
+            context=turn.context.combined_context,
+            chat_history=turn.history_context
+        )
+
+        return await self._complete_turn_async(turn, response)
+
+    async def process_stream_async(
+        self,
+        query: str,
+        session_data: Optional[SessionData] = None
+    ) -> AsyncIterator[Union[str, ConversationResponse]]:
+        """
+        Stream the reply as text chunks, then yield the stored ConversationResponse
+        once generation completes. Always uses the two-call path, since a
+        structured single-shot result cannot be streamed as plain text.
+
+        If the stream ends early (client disconnect or generation error), the
+        turn is still stored with the partial reply, so the user's message
+        stays in history.
+        """
+        turn = await self._prepare_turn_async(query, session_data)
+
+        prompt = self._construct_response_prompt(
+            query=query,
+            emotion_analysis=turn.emotion_analysis,
+            context=turn.context.combined_context,
+            chat_history=turn.history_context
+        )
+
+        chunks = []
+        streamed = False
+        try:
+            async for chunk in self.llm.astream(prompt):
+                chunks.append(chunk)
+                yield chunk
+            streamed = True
+        finally:
+            if not streamed:
+                self._store_interrupted_turn(turn, "".join(chunks).strip())
+
+        # Shielded, so a disconnect now does not cut the writes short
+        yield await asyncio.shield(self._complete_turn_async(turn, "".join(chunks).strip()))
+
+    def _store_interrupted_turn(self, turn: TurnState, partial: str) -> None:
+        """Store a turn whose stream ended early, in a task of its own"""
+        self._log_action(action="stream_interrupted", metadata={"query": turn.query, "partial_chars": len(partial)}, level=logging.WARNING, session_id=turn.session_id, user_id=turn.user_id)
+        # A cancelled request's task cannot await any more writes itself
+        task = asyncio.get_running_loop().create_task(self._complete_interrupted_turn(turn, partial))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _complete_interrupted_turn(self, turn: TurnState, partial: str) -> None:
+        try:
+            await self._complete_turn_async(turn, partial)
+        except Exception as e:
+            self._log_action(action="stream_store_error", metadata={"error": str(e)}, level=logging.ERROR, session_id=turn.session_id, user_id=turn.user_id)
+
+    def _prepare_turn(
+        self,
+        query: str,
+        session_data: Optional[SessionData],
+        analyze_emotion: bool = True
+    ) -> TurnState:
+        """Resolve the session and gather everything the reply prompt needs"""
+        user_id, session_id, is_new_session = self._resolve_session(session_data)
+
+        # Emotion analysis and history run on the stage pool while context
+        # gathering (itself fanned out) runs on this thread
+        started = time.monotonic()
+        emotion_future = self._submit_stage(self.emotion_agent.process, query) if analyze_emotion else None
+        history_future = self._submit_stage(self.history.get_full_context, session_id)
+
+        try:
+            context = self.context_agent.process(query)
+        except Exception as e:
+            self._log_action(action="stage_error", metadata={"stage": "context", "error": str(e)}, level=logging.ERROR)
+            context = ContextInfo(query=query)
+
+        emotion_analysis = self._stage_result(
+            "emotion", emotion_future, settings.EMOTION_STAGE_TIMEOUT, self._fallback_emotion_analysis(), started
+        ) if emotion_future else None
+        history_context = self._stage_result(
+            "history", history_future, settings.HISTORY_STAGE_TIMEOUT, "", started
+        )
+
+        return TurnState(
+            query=query,
+            chat_id=str(uuid.uuid4()),
+            user_id=user_id,
+            session_id=session_id,
+            is_new_user=(session_data is None),
+            is_new_session=is_new_session,
             emotion_analysis=emotion_analysis,
-            context=combined_context,
-            chat_history=history_context
+            context=context,
+            history_context=history_context
         )
-        
-        conversation_response = ConversationResponse(
-            session_data=SessionData(
-                user_id=user_id,
-                session_id=session_id,
-                is_new_user=(session_data is None),
-                is_new_session=is_new_session
+
+    async def _prepare_turn_async(
+        self,
+        query: str,
+        session_data: Optional[SessionData],
+        analyze_emotion: bool = True
+    ) -> TurnState:
+        """Async version of _prepare_turn"""
+        user_id, session_id, is_new_session = await self._resolve_session_async(session_data)
+
+        emotion_stage = self._run_stage(
+            "emotion",
+            self.emotion_agent.process_async(query),
+            settings.EMOTION_STAGE_TIMEOUT,
+            self._fallback_emotion_analysis()
+        ) if analyze_emotion else asyncio.sleep(0, result=None)
+
+        # Independent stages fan out; turn latency is max(stage) + generation
+        emotion_analysis, context, history_context = await asyncio.gather(
+            emotion_stage,
+            self._run_stage(
+                "context",
+                self.context_agent.process_async(query),
+                settings.CONTEXT_STAGE_TIMEOUT,
+                ContextInfo(query=query)
             ),
-            response=response,
+            self._run_stage(
+                "history",
+                self.history.get_full_context_async(session_id),
+                settings.HISTORY_STAGE_TIMEOUT,
+                ""
+            )
+        )
+
+        return TurnState(
+            query=query,
+            chat_id=str(uuid.uuid4()),
+            user_id=user_id,
+            session_id=session_id,
+            is_new_user=(session_data is None),
+            is_new_session=is_new_session,
             emotion_analysis=emotion_analysis,
             context=context,
-            query=query,
-            safety_level="unknown",
-            suggested_resources=[]
+            history_context=history_context
         )
 
-        self.memory_manager.store_conversation(session_id, chat_id, conversation_response)
-        self.history.add_conversation(session_id, chat_id, conversation_response)
+    def _complete_turn(self, turn: TurnState, response: str) -> ConversationResponse:
+        """Build, persist and log the final response for a turn"""
+        conversation_response = self._build_conversation_response(turn, response)
+
+        self.memory_manager.store_conversation(turn.session_id, turn.chat_id, conversation_response, turn.user_id)
+        self.history.add_conversation(turn.session_id, turn.chat_id, conversation_response)
+        if settings.HISTORY_SUMMARY_ENABLED:
+            self.summary_agent.schedule(turn.session_id)
+
+        self._log_action(action="conversation", metadata={"query": turn.query, "response": response}, level=logging.INFO, session_id=turn.session_id, user_id=turn.user_id)
 
-        self._log_action(action="conversation", metadata={"query": query, "response": response}, level=logging.INFO, session_id=session_id, user_id=user_id)
-        
         return conversation_response
+
+    async def _complete_turn_async(self, turn: TurnState, response: str) -> ConversationResponse:
+        """Async version of _complete_turn"""
+        conversation_response = self._build_conversation_response(turn, response)
+
+        # Independent writes, so their round trips overlap
+        await asyncio.gather(
+            self.memory_manager.store_conversation_async(turn.session_id, turn.chat_id, conversation_response, turn.user_id),
+            self.history.add_conversation_async(turn.session_id, turn.chat_id, conversation_response)
+        )
+        if settings.HISTORY_SUMMARY_ENABLED:
+            self.summary_agent.schedule_async(turn.session_id)
+
+        self._log_action(action="conversation", metadata={"query": turn.query, "response": response}, level=logging.INFO, session_id=turn.session_id, user_id=turn.user_id)
+
+        return conversation_response
+
+    def _resolve_session(self, session_data: Optional[SessionData]) -> Tuple[str, str, bool]:
+        """Validate or create IDs. Returns: (user_id, session_id, is_new_session)"""
+        if session_data:
+            user_id = self.session_manager.validate_session(session_data.session_id)
+            if user_id:
+                # Existing valid session
+                return user_id, session_data.session_id, False
+            # Expired session, create new
+            user_id, session_id = self.session_manager.generate_ids(session_data.user_id)
+            return user_id, session_id, True
+        # New conversation
+        user_id, session_id = self.session_manager.generate_ids()
+        return user_id, session_id, True
+
+    async def _resolve_session_async(self, session_data: Optional[SessionData]) -> Tuple[str, str, bool]:
+        """Async version of _resolve_session"""
+        if session_data:
+            user_id = await self.session_manager.validate_session_async(session_data.session_id)
+            if user_id:
+                return user_id, session_data.session_id, False
+            user_id, session_id = await self.session_manager.generate_ids_async(session_data.user_id)
+            return user_id, session_id, True
+        user_id, session_id = await self.session_manager.generate_ids_async()
+        return user_id, session_id, True
+
+    def _fallback_emotion_analysis(self) -> EmotionalAnalysis:
+        """Neutral analysis used when the emotion stage misses its deadline"""
+        return EmotionalAnalysis(
+            primary_emotion="neutral",
+            intensity=5,
+            secondary_emotions=[],
+            triggers=[],
+            coping_strategies=[],
+            confidence_score=0.0
+        )
+
+    def _build_conversation_response(self, turn: TurnState, response: str) -> ConversationResponse:
+        return ConversationResponse(
+            session_data=SessionData(
+                user_id=turn.user_id,
+                session_id=turn.session_id,
+                is_new_user=turn.is_new_user,
+                is_new_session=turn.is_new_session
+            ),
+            response=response,
+            emotion_analysis=turn.emotion_analysis,
+            context=turn.context,
+            query=turn.query,
+            safety_level="unknown",
+            suggested_resources=[]
+        )
     
     def _generate_response(
         self,
         query: str,
         emotion_analysis: Optional[EmotionalAnalysis],
-        context: Optional[ContextInfo],
-        chat_history: Optional[List[Dict]]
+        context: Optional[str],
+        chat_history: Optional[str]
     ) -> str:
         
         prompt = self._construct_response_prompt(
@@ -108,7 +339,61 @@ class ConversationAgent(BaseAgent):
         
         response = self.llm.generate(prompt)
         return response.content.strip()
+
+    async def _generate_response_async(
+        self,
+        query: str,
+        emotion_analysis: Optional[EmotionalAnalysis],
+        context: Optional[str],
+        chat_history: Optional[str]
+    ) -> str:
+        prompt = self._construct_response_prompt(
+            query=query,
+            emotion_analysis=emotion_analysis,
+            context=context,
+            chat_history=chat_history
+        )
+
+        response = await self.llm.agenerate(prompt)
+        return response.content.strip()
     
+    def _generate_fused(self, turn: TurnState) -> Optional[TherapistTurn]:
+        """Single structured call for emotion analysis and reply; None on failure"""
+        try:
+            return self.llm.generate_structured(self._construct_single_shot_prompt(turn), TherapistTurn)
+        except Exception as e:
+            self._log_action(action="single_shot_fallback", metadata={"error": str(e)}, level=logging.WARNING, session_id=turn.session_id)
+            return None
+
+    async def _generate_fused_async(self, turn: TurnState) -> Optional[TherapistTurn]:
+        """Async version of _generate_fused"""
+        try:
+            return await self.llm.agenerate_structured(self._construct_single_shot_prompt(turn), TherapistTurn)
+        except Exception as e:
+            self._log_action(action="single_shot_fallback", metadata={"error": str(e)}, level=logging.WARNING, session_id=turn.session_id)
+            return None
+
+    def _construct_single_shot_prompt(self, turn: TurnState) -> str:
+        prompt = self._construct_response_prompt(
+            query=turn.query,
+            emotion_analysis="Not provided. Infer it yourself from the user query and chat history.",
+            context=turn.context.combined_context,
+            chat_history=turn.history_context
+        )
+        output_instructions = """
+            Output Format:
+
+            Return both your analysis of the user's emotional state and your reply:
+            - emotion_analysis.primary_emotion: single emotion
+            - emotion_analysis.intensity: integer between 1 and 10
+            - emotion_analysis.secondary_emotions: list of emotions
+            - emotion_analysis.triggers: list of emotional triggers
+            - emotion_analysis.coping_strategies: list of suggested coping strategies
+            - emotion_analysis.confidence_score: number between 0 and 1
+            - response: your reply to the user, written as described above
+        """
+        return prompt + "\n\n" + textwrap.dedent(output_instructions).strip()
+
     def _construct_response_prompt(self, **kwargs) -> str:
         # Implement sophisticated prompt construction
         prompt = f"""
@@ -193,11 +478,3 @@ class ConversationAgent(BaseAgent):
                 """
 
         return textwrap.dedent(prompt).strip()
-
-    
-    async def process_async(
-        self,
-        query: str,
-        session_data: Optional[SessionData] = None
-    ) -> ConversationResponse:
-        return await asyncio.to_thread(self.process, query, session_data)
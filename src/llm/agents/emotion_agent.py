@@ -1,16 +1,96 @@
 import textwrap
-import asyncio
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import logging
 from .base_agent import BaseAgent
+from src.llm.core.config import settings
+from src.llm.core.emotion_classifier import LocalEmotionClassifier
+from src.llm.core.registry import registry
 from src.llm.models.schemas import EmotionalAnalysis
 
 class EmotionAgent(BaseAgent):
+    def __init__(
+        self,
+        *args,
+        backend: str = settings.EMOTION_BACKEND,
+        classifier: Optional[LocalEmotionClassifier] = None,
+        **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.backend = backend
+        self.classifier = classifier
+        if self.backend == "local" and self.classifier is None:
+            self.classifier = registry.emotion_classifier
+
     def process(self, text: str) -> EmotionalAnalysis:
         """Process text for emotional content"""
+        if self.backend == "local":
+            analysis = self._analysis_from_scores(text, self.classifier.classify(text))
+            if settings.EMOTION_LLM_ENRICHMENT:
+                analysis = self._enrich(text, analysis)
+            return analysis
+
         prompt = self._construct_emotion_prompt(text)
-        response = self.llm.generate(prompt)
-        analysis = self._parse_emotion_response(response.content)
+        response = self.llm.generate(prompt, cache_site="emotion")
+        return self._build_analysis(text, response.content)
+
+    async def process_async(self, text: str) -> EmotionalAnalysis:
+        """Async version backed by the LLM's native async generation"""
+        if self.backend == "local":
+            analysis = self._analysis_from_scores(text, await self.classifier.classify_async(text))
+            if settings.EMOTION_LLM_ENRICHMENT:
+                analysis = await self._enrich_async(text, analysis)
+            return analysis
+
+        prompt = self._construct_emotion_prompt(text)
+        response = await self.llm.agenerate(prompt, cache_site="emotion")
+        return self._build_analysis(text, response.content)
+
+    def _analysis_from_scores(self, text: str, scores: Dict[str, float]) -> EmotionalAnalysis:
+        """Map classifier label scores onto EmotionalAnalysis"""
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        primary, top_score = ranked[0]
+        # A confident "neutral" means low emotional intensity, not high
+        strength = 1 - top_score if primary == "neutral" else top_score
+        analysis = EmotionalAnalysis(
+            primary_emotion=primary.capitalize(),
+            intensity=max(1, min(10, round(1 + 9 * strength))),
+            secondary_emotions=[
+                label.capitalize() for label, score in ranked[1:]
+                if label != "neutral" and score >= settings.EMOTION_SECONDARY_THRESHOLD
+            ],
+            triggers=[],
+            coping_strategies=[],
+            confidence_score=max(0.0, min(1.0, top_score))
+        )
+        self._log_action(action="emotion_analysis", metadata={"text": text, "analysis": analysis.dict(), "backend": "local"}, level=logging.INFO)
+        return analysis
+
+    def _enrich(self, text: str, analysis: EmotionalAnalysis) -> EmotionalAnalysis:
+        """Fill triggers and coping strategies from the LLM; keep local labels on failure"""
+        try:
+            response = self.llm.generate(self._construct_emotion_prompt(text), cache_site="emotion")
+            return self._merge_enrichment(analysis, self._parse_emotion_response(response.content))
+        except Exception as e:
+            self._log_action(action="emotion_enrichment_error", metadata={"error": str(e)}, level=logging.WARNING)
+            return analysis
+
+    async def _enrich_async(self, text: str, analysis: EmotionalAnalysis) -> EmotionalAnalysis:
+        """Async version of _enrich"""
+        try:
+            response = await self.llm.agenerate(self._construct_emotion_prompt(text), cache_site="emotion")
+            return self._merge_enrichment(analysis, self._parse_emotion_response(response.content))
+        except Exception as e:
+            self._log_action(action="emotion_enrichment_error", metadata={"error": str(e)}, level=logging.WARNING)
+            return analysis
+
+    def _merge_enrichment(self, analysis: EmotionalAnalysis, parsed: dict) -> EmotionalAnalysis:
+        return analysis.copy(update={
+            "triggers": parsed['emotional_triggers'],
+            "coping_strategies": parsed['coping_strategies']
+        })
+
+    def _build_analysis(self, text: str, content: str) -> EmotionalAnalysis:
+        analysis = self._parse_emotion_response(content)
         self._log_action(action="emotion_analysis", metadata={"text": text, "analysis": analysis}, level=logging.INFO)
         
         return EmotionalAnalysis(
@@ -117,9 +197,3 @@ class EmotionAgent(BaseAgent):
                 level=logging.ERROR
             )
             raise ValueError(f"Failed to parse emotion response: {str(e)}")
-        
-    async def process_async(self, text: str) -> EmotionalAnalysis:
-        return await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: self.process(text)
-        )
\ No newline at end of file
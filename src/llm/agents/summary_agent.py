@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import textwrap
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Set
+from .base_agent import BaseAgent
+from src.llm.core.config import settings
+
+
+class SummaryAgent(BaseAgent):
+    """
+    Folds turns that have left the prompt's history window into the session's
+    rolling summary. Runs after a turn is stored, never on the request path;
+    turns stay in the backlog until a summary covering them is written, so a
+    failed or skipped run is picked up by the next one.
+    """
+
+    # Separate from the stage pool so slow summaries never delay a request
+    _summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="thery-summary")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tasks: Set[asyncio.Task] = set()
+
+    def schedule(self, session_id: str) -> None:
+        """Summarise in the background"""
+        self._summary_executor.submit(self.process, session_id)
+
+    def schedule_async(self, session_id: str) -> None:
+        """Summarise in a task on the running loop"""
+        task = asyncio.get_running_loop().create_task(self.process_async(session_id))
+        # The loop only keeps weak references to tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def process(self, session_id: str) -> bool:
+        """Fold the session's backlog into its summary; True if a summary was written"""
+        token = self.history.acquire_summary_lock(session_id)
+        if not token:
+            return False
+        try:
+            summary, turns = self.history.get_summary_backlog(session_id)
+            if not turns:
+                return False
+            response = self.llm.generate(self._construct_summary_prompt(summary, turns))
+            if not self.history.store_summary(session_id, response.content.strip(), turns):
+                return self._discard_summary(session_id)
+            self._log_action(action="history_summarized", metadata={"turns": len(turns)}, level=logging.INFO, session_id=session_id)
+            return True
+        except Exception as e:
+            self._log_action(action="history_summary_error", metadata={"error": str(e)}, level=logging.WARNING, session_id=session_id)
+            return False
+        finally:
+            self.history.release_summary_lock(session_id, token)
+
+    async def process_async(self, session_id: str) -> bool:
+        """Async version of process"""
+        token = await self.history.acquire_summary_lock_async(session_id)
+        if not token:
+            return False
+        try:
+            summary, turns = await self.history.get_summary_backlog_async(session_id)
+            if not turns:
+                return False
+            response = await self.llm.agenerate(self._construct_summary_prompt(summary, turns))
+            if not await self.history.store_summary_async(session_id, response.content.strip(), turns):
+                return self._discard_summary(session_id)
+            self._log_action(action="history_summarized", metadata={"turns": len(turns)}, level=logging.INFO, session_id=session_id)
+            return True
+        except Exception as e:
+            self._log_action(action="history_summary_error", metadata={"error": str(e)}, level=logging.WARNING, session_id=session_id)
+            return False
+        finally:
+            await self.history.release_summary_lock_async(session_id, token)
+
+    def _discard_summary(self, session_id: str) -> bool:
+        # The backlog was trimmed away while summarising; the next run starts over
+        self._log_action(action="history_summary_discarded", metadata={}, level=logging.INFO, session_id=session_id)
+        return False
+
+    def _construct_summary_prompt(self, summary: str, turns: List[str]) -> str:
+        # Rough words-per-token ratio, to state the limit in terms the model follows
+        max_words = int(settings.HISTORY_SUMMARY_MAX_TOKENS * 0.75)
+        summary_prompt = f"""
+            You maintain a running summary of a supportive conversation between a user and Thery AI, a virtual therapist.
+
+            Current summary:
+            {{summary}}
+
+            Earlier turns to fold into it:
+            {{turns}}
+
+            Rewrite the summary so it also covers these turns. Keep what matters for continuing the conversation:
+            the user's main concerns and circumstances, how their emotional state has changed, strategies already
+            suggested and how they responded, and any safety concerns. Write plain prose in the third person,
+            under {max_words} words, with no preamble.
+        """
+        # Filled in after dedenting, since their own lines are not indented
+        return (
+            textwrap.dedent(summary_prompt).strip()
+            .replace("{summary}", summary or "(none yet)", 1)
+            .replace("{turns}", "\n".join(turns), 1)
+        )
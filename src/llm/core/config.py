@@ -1,6 +1,6 @@
 from dotenv import load_dotenv
 import os
-from typing import Optional
+from typing import Dict, Optional
 from pydantic_settings import BaseSettings
 
 load_dotenv()
@@ -22,18 +22,121 @@ class Settings(BaseSettings):
     REDIS_DB: int = 0
     REDIS_USERNAME: Optional[str] = None
     REDIS_PASSWORD: Optional[str] = None
+    # Connection pools: per-pool connection cap, socket timeouts (seconds),
+    # a PING before reusing a connection idle longer than the health-check
+    # interval, and retries with exponential backoff on connection errors
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_SOCKET_TIMEOUT: float = 5.0
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 5.0
+    REDIS_SOCKET_KEEPALIVE: bool = True
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    REDIS_RETRY_ATTEMPTS: int = 3
+    REDIS_RETRY_BACKOFF_BASE: float = 0.05
+    REDIS_RETRY_BACKOFF_CAP: float = 1.0
 
     # Postgres — passed as a full URL
     POSTGRES_URL: Optional[str] = None
 
-    # Session
+    # Vector store: VECTOR_INDEX_MMAP maps the FAISS index and the compact
+    # docstore read-only so multiple workers share one copy of the pages
+    VECTOR_DB_PATH: str = "vector_embedding/mental_health_vector_db"
+    VECTOR_INDEX_MMAP: bool = False
+    # Query-time overrides for the index_spec.json written by the builder
+    VECTOR_NPROBE: Optional[int] = None
+    VECTOR_EF_SEARCH: Optional[int] = None
+    # Query embedding cache: in-process LRU entries, plus an optional Redis
+    # tier (TTL in seconds, 0 disables it)
+    EMBEDDING_CACHE_SIZE: int = 2048
+    EMBEDDING_CACHE_REDIS_TTL: int = 0
+    # Query embedding backend: "torch" (sentence-transformers) or "onnx"
+    # (int8 export from `python -m src.utils.export_onnx`)
+    EMBEDDING_BACKEND: str = "torch"
+    ONNX_EMBEDDING_PATH: str = "vector_embedding/onnx/all-MiniLM-L6-v2"
+    EMBEDDING_NUM_THREADS: Optional[int] = None
+    # Retrieval: "dense" (FAISS only) or "hybrid" (FAISS + BM25 fused with
+    # reciprocal rank fusion); hybrid needs the bm25.* files written by ingestion
+    RETRIEVAL_MODE: str = "dense"
+    VECTOR_SEARCH_K: int = 5
+    HYBRID_CANDIDATES: int = 20
+    HYBRID_RRF_K: int = 60
+    # Online additions (FAISSVectorSearch.add_texts) go to an in-memory delta
+    # that a background thread flushes to <db>/deltas every interval or
+    # FLUSH_SIZE chunks, and merges into the base index at COMPACT_SIZE chunks.
+    # Workers share the log under a file lock and pick up each other's
+    # segments and compactions on the same interval
+    VECTOR_WRITE_BUFFERED: bool = True
+    VECTOR_DELTA_FLUSH_INTERVAL: float = 5.0
+    VECTOR_DELTA_FLUSH_SIZE: int = 256
+    VECTOR_DELTA_COMPACT_SIZE: int = 5000
+
+    # Session: every per-session key shares this TTL, refreshed on activity
     SESSION_TTL: int = 86400
+    # Prompt history: up to HISTORY_CONTEXT_TURNS recent turns verbatim within
+    # HISTORY_TOKEN_BUDGET (estimated tokens, summary included). Older turns
+    # are folded into a rolling per-session summary off the request path, in
+    # batches of HISTORY_SUMMARY_BATCH; at most HISTORY_SUMMARY_BACKLOG turns
+    # wait to be folded before the oldest are dropped
+    HISTORY_CONTEXT_TURNS: int = 10
+    HISTORY_TOKEN_BUDGET: int = 1500
+    HISTORY_SUMMARY_ENABLED: bool = True
+    HISTORY_SUMMARY_MAX_TOKENS: int = 300
+    HISTORY_SUMMARY_BATCH: int = 4
+    HISTORY_SUMMARY_BACKLOG: int = 40
+    HISTORY_SUMMARY_LOCK_TIMEOUT: int = 120
+    # Full history records kept per session; older ones are trimmed along
+    # with their records in the chats hash
+    HISTORY_MAX_TURNS: int = 200
+    # Background sweep that removes expired ids from user:{id}:sessions and
+    # per-session keys whose session is gone. SCANs SESSION_SWEEP_BATCH keys
+    # at a time; only the worker holding a Redis lease (SESSION_SWEEP_LEASE
+    # seconds, renewed while it runs) sweeps
+    SESSION_SWEEP_ENABLED: bool = True
+    SESSION_SWEEP_INTERVAL: int = 3600
+    SESSION_SWEEP_LEASE: int = 60
+    SESSION_SWEEP_BATCH: int = 200
+    SESSION_SWEEP_PAUSE: float = 0.01
+    # History and chat records are msgpack; "zstd" also compresses records of
+    # at least REDIS_RECORD_COMPRESS_MIN_BYTES when zstandard is installed
+    REDIS_RECORD_COMPRESSION: str = "zstd"
+    REDIS_RECORD_COMPRESS_MIN_BYTES: int = 512
 
     # LLM generation knobs
     MAX_RETRIES: int = 3
     MAX_TOKENS: int = 2048
     SAFETY_THRESHOLD: float = 0.95
 
+    # Per-stage deadlines (seconds) for the conversation fan-out; a stage
+    # that misses its deadline degrades to an empty result
+    EMOTION_STAGE_TIMEOUT: float = 10.0
+    CONTEXT_STAGE_TIMEOUT: float = 8.0
+    WEB_SEARCH_TIMEOUT: float = 6.0
+    VECTOR_SEARCH_TIMEOUT: float = 3.0
+    HISTORY_STAGE_TIMEOUT: float = 2.0
+    STAGE_EXECUTOR_WORKERS: int = 16
+
+    # Fuse emotion analysis and the reply into one structured LLM call,
+    # falling back to the two-call path if the output fails validation
+    SINGLE_SHOT_MODE: bool = False
+
+    # LLM response cache (Redis); TTLs are per call site in seconds and a
+    # site missing from the map is never cached (e.g. the therapist reply)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTLS: Dict[str, int] = {"emotion": 3600}
+    LLM_CACHE_MAX_ENTRIES: int = 10000
+    LLM_CACHE_MAX_ENTRY_BYTES: int = 16384
+    # While Redis is unreachable calls go uncached; seconds between reconnects
+    LLM_CACHE_RETRY_INTERVAL: int = 30
+
+    # Emotion analysis backend: "llm" (Gemini prompt) or "local" (CPU classifier)
+    EMOTION_BACKEND: str = "llm"
+    EMOTION_MODEL_NAME: str = "j-hartmann/emotion-english-distilroberta-base"
+    EMOTION_MODEL_RUNTIME: str = "torch"  # "torch", "int8" or "onnx"
+    EMOTION_MAX_BATCH_SIZE: int = 16
+    EMOTION_MAX_BATCH_WAIT_MS: float = 10.0
+    EMOTION_SECONDARY_THRESHOLD: float = 0.1
+    # Ask the LLM for triggers/coping strategies on top of the local labels
+    EMOTION_LLM_ENRICHMENT: bool = False
+
     # LangSmith tracing (optional)
     LANGCHAIN_API_KEY: Optional[str] = None
     LANGCHAIN_TRACING_V2: Optional[str] = None
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from src.llm.core.config import settings
+from src.llm.utils.logging import TheryBotLogger
+
+class LocalEmotionClassifier:
+    """
+    CPU text-classification backend for emotion detection.
+
+    Concurrent async callers are coalesced into micro-batches (up to
+    `max_batch_size` texts or `max_batch_wait_ms` of waiting) so one forward
+    pass serves many in-flight turns. `runtime` selects full-precision
+    torch, dynamically quantized int8 torch, or ONNX Runtime via optimum.
+    """
+
+    def __init__(
+        self,
+        model_name: str = settings.EMOTION_MODEL_NAME,
+        runtime: str = settings.EMOTION_MODEL_RUNTIME,
+        max_batch_size: int = settings.EMOTION_MAX_BATCH_SIZE,
+        max_batch_wait_ms: float = settings.EMOTION_MAX_BATCH_WAIT_MS,
+        logger: Optional[TheryBotLogger] = None
+    ):
+        self.model_name = model_name
+        self.runtime = runtime
+        self.max_batch_size = max_batch_size
+        self.max_batch_wait = max_batch_wait_ms / 1000
+        self.logger = logger or TheryBotLogger()
+        self._pipeline = self._load_pipeline()
+        # The HF pipeline is not safe to call from several threads at once
+        self._inference_lock = threading.Lock()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _load_pipeline(self) -> Any:
+        from transformers import AutoTokenizer, pipeline
+
+        tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        if self.runtime == "onnx":
+            try:
+                from optimum.onnxruntime import ORTModelForSequenceClassification
+            except ImportError:
+                raise RuntimeError(
+                    "EMOTION_MODEL_RUNTIME=onnx requires the onnx extra (poetry install -E onnx, "
+                    "or pip install -r requirements-onnx.txt)"
+                )
+            model = ORTModelForSequenceClassification.from_pretrained(self.model_name, export=True)
+        else:
+            from transformers import AutoModelForSequenceClassification
+
+            model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+            model.eval()
+            if self.runtime == "int8":
+                import torch
+                model = torch.quantization.quantize_dynamic(
+                    model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+
+        self.logger.log_interaction(
+            interaction_type="emotion_classifier_loaded",
+            data={"model": self.model_name, "runtime": self.runtime},
+            level=logging.INFO
+        )
+        return pipeline(
+            "text-classification",
+            model=model,
+            tokenizer=tokenizer,
+            top_k=None,
+            truncation=True,
+            device=-1
+        )
+
+    def classify_batch(self, texts: List[str]) -> List[Dict[str, float]]:
+        """Return a label -> score mapping for every text"""
+        with self._inference_lock:
+            outputs = self._pipeline(texts, batch_size=len(texts))
+        return [
+            {item["label"].lower(): float(item["score"]) for item in output}
+            for output in outputs
+        ]
+
+    def classify(self, text: str) -> Dict[str, float]:
+        return self.classify_batch([text])[0]
+
+    async def classify_async(self, text: str) -> Dict[str, float]:
+        """Queue the text for the next micro-batch and await its scores"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._start_worker(loop)
+        future = loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    def _start_worker(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._worker = loop.create_task(self._batch_worker())
+
+    async def _batch_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[Tuple[str, asyncio.Future]] = [await self._queue.get()]
+            deadline = loop.time() + self.max_batch_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                results = await asyncio.to_thread(self.classify_batch, [text for text, _ in batch])
+                for (_, future), scores in zip(batch, results):
+                    if not future.done():
+                        future.set_result(scores)
+            except Exception as e:
+                self.logger.log_interaction(
+                    interaction_type="emotion_classifier_error",
+                    data={"error": str(e), "batch_size": len(batch)},
+                    level=logging.ERROR
+                )
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def close(self) -> None:
+        """Stop the batching worker"""
+        if self._worker:
+            self._worker.cancel()
+            self._worker = None
+            self._loop = None
@@ -1,14 +1,31 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, List, Type, TypeVar, Union
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import AIMessage
+from pydantic import BaseModel
 import logging
+import time
 from src.llm.core.config import settings
 from src.llm.utils.logging import TheryBotLogger
+from src.llm.memory.response_cache import LLMResponseCache
 
 class LLMError(Exception):
     """Custom exception for LLM-related errors"""
     pass
 
+StructuredT = TypeVar("StructuredT", bound=BaseModel)
+
+def content_text(content: Union[str, List[Any]]) -> str:
+    """Text of a message's content, which Gemini may send as a list of content blocks"""
+    if isinstance(content, str):
+        return content
+    parts = []
+    for block in content:
+        if isinstance(block, str):
+            parts.append(block)
+        elif isinstance(block, dict) and block.get("type", "text") == "text":
+            parts.append(block.get("text", ""))
+    return "".join(parts)
+
 class TheryLLM:
     """Gemini-backed LLM wrapper with safety checks and response validation"""
 
@@ -18,13 +35,17 @@ class TheryLLM:
         temperature: float = 0.3,
         max_retries: int = 3,
         safety_threshold: float = 0.75,
-        logger: Optional[TheryBotLogger] = None
+        logger: Optional[TheryBotLogger] = None,
+        cache: Optional[LLMResponseCache] = None
     ):
         self.model_name = model_name
         self.temperature = temperature
         self.max_retries = max_retries
         self.safety_threshold = safety_threshold
         self.logger = logger or TheryBotLogger()
+        self._cache = cache
+        self._cache_retry_at = 0.0
+        self._structured_llms: Dict[type, Any] = {}
         self._initialize_llm()
 
     def _initialize_llm(self) -> None:
@@ -37,6 +58,7 @@ class TheryLLM:
                 google_api_key=settings.GOOGLE_API_KEY,
                 max_tokens=settings.MAX_TOKENS,
             )
+            self._structured_llms = {}
             self._session_active = True
         except Exception as e:
             self._session_active = False
@@ -47,10 +69,41 @@ class TheryLLM:
             )
             raise LLMError(f"LLM initialization failed: {str(e)}")
     
-    def generate(self, prompt: str, **kwargs) -> AIMessage:
-        """Generate a response with safety checks and validation"""
+    @property
+    def cache(self) -> Optional[LLMResponseCache]:
+        """
+        Response cache, created on first use so Redis is only touched when
+        caching. None while Redis is unreachable, in which case calls go
+        uncached and creation is retried after LLM_CACHE_RETRY_INTERVAL.
+        """
+        if self._cache is None and time.monotonic() >= self._cache_retry_at:
+            try:
+                self._cache = LLMResponseCache()
+            except Exception as e:
+                self._cache_retry_at = time.monotonic() + settings.LLM_CACHE_RETRY_INTERVAL
+                self.logger.log_interaction(
+                    interaction_type="llm_cache_unavailable",
+                    data={"error": str(e)},
+                    level=logging.WARNING,
+                )
+        return self._cache
+
+    def generate(self, prompt: str, cache_site: Optional[str] = None, **kwargs) -> AIMessage:
+        """
+        Generate a response with safety checks and validation.
+
+        `cache_site` names the call site; sites with a TTL in
+        settings.LLM_CACHE_TTLS are served from the response cache.
+        """
         if not self._session_active:
             self._initialize_llm()
+
+        cache = self.cache if LLMResponseCache.ttl_for(cache_site) else None
+        if cache is not None:
+            cache_key = cache.make_key(self.model_name, self.temperature, prompt)
+            cached = cache.get(cache_key, cache_site)
+            if cached is not None:
+                return AIMessage(content=cached, response_metadata={"cache_hit": True})
         
         try:
             # Log the generation attempt
@@ -73,8 +126,6 @@ class TheryLLM:
                 level=logging.INFO
             )
             
-            return validated_response
-            
         except Exception as e:
             self.logger.log_interaction(
                 interaction_type="llm_generation_error",
@@ -82,7 +133,131 @@ class TheryLLM:
                 level=logging.ERROR
             )
             raise LLMError(f"Generation failed: {str(e)}")
+
+        if cache is not None:
+            cache.set(cache_key, validated_response.content, LLMResponseCache.ttl_for(cache_site), cache_site)
+        return validated_response
     
+    async def agenerate(self, prompt: str, cache_site: Optional[str] = None, **kwargs) -> AIMessage:
+        """Async counterpart of `generate` built on the chat model's `ainvoke`"""
+        if not self._session_active:
+            self._initialize_llm()
+
+        cache = self.cache if LLMResponseCache.ttl_for(cache_site) else None
+        if cache is not None:
+            cache_key = cache.make_key(self.model_name, self.temperature, prompt)
+            cached = await cache.get_async(cache_key, cache_site)
+            if cached is not None:
+                return AIMessage(content=cached, response_metadata={"cache_hit": True})
+
+        try:
+            self.logger.log_interaction(
+                interaction_type="llm_generation_attempt",
+                data={"prompt": prompt, "kwargs": kwargs, "mode": "async"},
+                level=logging.INFO
+            )
+
+            response = await self.llm.ainvoke(prompt)
+            validated_response = self._validate_response(response)
+
+            self.logger.log_interaction(
+                interaction_type="llm_generation_success",
+                data={"prompt": prompt, "response": str(validated_response), "mode": "async"},
+                level=logging.INFO
+            )
+
+        except Exception as e:
+            self.logger.log_interaction(
+                interaction_type="llm_generation_error",
+                data={"prompt": prompt, "error": str(e), "mode": "async"},
+                level=logging.ERROR
+            )
+            raise LLMError(f"Generation failed: {str(e)}")
+
+        if cache is not None:
+            await cache.set_async(cache_key, validated_response.content, LLMResponseCache.ttl_for(cache_site), cache_site)
+        return validated_response
+
+    def generate_structured(self, prompt: str, schema: Type[StructuredT]) -> StructuredT:
+        """Generate output validated against a pydantic schema"""
+        if not self._session_active:
+            self._initialize_llm()
+
+        try:
+            result = self._structured_llm(schema).invoke(prompt)
+            return self._validate_structured(result, schema)
+        except Exception as e:
+            self.logger.log_interaction(
+                interaction_type="llm_structured_generation_error",
+                data={"prompt": prompt, "schema": schema.__name__, "error": str(e)},
+                level=logging.ERROR
+            )
+            raise LLMError(f"Structured generation failed: {str(e)}")
+
+    async def agenerate_structured(self, prompt: str, schema: Type[StructuredT]) -> StructuredT:
+        """Async version of generate_structured"""
+        if not self._session_active:
+            self._initialize_llm()
+
+        try:
+            result = await self._structured_llm(schema).ainvoke(prompt)
+            return self._validate_structured(result, schema)
+        except Exception as e:
+            self.logger.log_interaction(
+                interaction_type="llm_structured_generation_error",
+                data={"prompt": prompt, "schema": schema.__name__, "error": str(e)},
+                level=logging.ERROR
+            )
+            raise LLMError(f"Structured generation failed: {str(e)}")
+
+    def _structured_llm(self, schema: type) -> Any:
+        if schema not in self._structured_llms:
+            self._structured_llms[schema] = self.llm.with_structured_output(schema)
+        return self._structured_llms[schema]
+
+    def _validate_structured(self, result: Any, schema: Type[StructuredT]) -> StructuredT:
+        # Re-validate so field constraints hold whatever the provider returned
+        if isinstance(result, BaseModel):
+            result = result.model_dump()
+        if result is None:
+            raise LLMError("Empty structured response")
+        return schema.model_validate(result)
+
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """Stream response text chunks as the chat model produces them"""
+        if not self._session_active:
+            self._initialize_llm()
+
+        self.logger.log_interaction(
+            interaction_type="llm_generation_attempt",
+            data={"prompt": prompt, "kwargs": kwargs, "mode": "stream"},
+            level=logging.INFO
+        )
+
+        chunks = []
+        try:
+            async for chunk in self.llm.astream(prompt):
+                text = content_text(chunk.content)
+                if text:
+                    chunks.append(text)
+                    yield text
+        except Exception as e:
+            self.logger.log_interaction(
+                interaction_type="llm_generation_error",
+                data={"prompt": prompt, "error": str(e), "mode": "stream"},
+                level=logging.ERROR
+            )
+            raise LLMError(f"Generation failed: {str(e)}")
+
+        # Streamed output gets the same validation as a complete response
+        self._validate_response(AIMessage(content="".join(chunks)))
+
+        self.logger.log_interaction(
+            interaction_type="llm_generation_success",
+            data={"prompt": prompt, "response": "".join(chunks), "mode": "stream"},
+            level=logging.INFO
+        )
+
     def _validate_response(
         self,
         response: AIMessage
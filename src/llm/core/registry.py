@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+from src.llm.core.config import settings
+from src.llm.core.llm import TheryLLM
+from src.llm.utils.logging import TheryBotLogger
+from src.llm.memory.redis_connection import RedisConnection
+from src.llm.memory.history import RedisHistory
+from src.llm.memory.memory_manager import RedisMemoryManager
+from src.llm.memory.session_manager import SessionManager
+from src.llm.memory.session_sweeper import SessionSweeper
+
+class ComponentRegistry:
+    """
+    Process-wide container for heavy components shared by the API and the
+    Telegram bot: one LLM client, one embedding model, one FAISS index and
+    one Redis pool. Components are created lazily on first access.
+    """
+
+    def __init__(self, logger: Optional[TheryBotLogger] = None):
+        self.logger = logger or TheryBotLogger()
+        self._lock = threading.RLock()
+        self._components: Dict[str, Any] = {}
+
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        component = self._components.get(name)
+        if component is None:
+            with self._lock:
+                component = self._components.get(name)
+                if component is None:
+                    component = factory()
+                    self._components[name] = component
+        return component
+
+    @property
+    def redis(self) -> RedisConnection:
+        return self._get("redis", RedisConnection)
+
+    @property
+    def llm(self) -> TheryLLM:
+        return self._get("llm", TheryLLM)
+
+    @property
+    def history(self) -> RedisHistory:
+        return self._get("history", RedisHistory)
+
+    @property
+    def session_manager(self) -> SessionManager:
+        return self._get("session_manager", SessionManager)
+
+    @property
+    def memory_manager(self) -> RedisMemoryManager:
+        return self._get("memory_manager", RedisMemoryManager)
+
+    @property
+    def session_sweeper(self) -> SessionSweeper:
+        return self._get("session_sweeper", SessionSweeper)
+
+    @property
+    def embedding_model(self) -> Any:
+        from src.llm.memory.vector_store import default_embedding_model
+        return self._get("embedding_model", default_embedding_model)
+
+    @property
+    def query_embeddings(self) -> Any:
+        from src.llm.memory.embedding_cache import CachedQueryEmbeddings
+        return self._get(
+            "query_embeddings",
+            lambda: CachedQueryEmbeddings(self.embedding_model)
+        )
+
+    @property
+    def vector_search(self) -> Any:
+        from src.llm.memory.partitioned_store import load_vector_search
+        return self._get(
+            "vector_search",
+            lambda: load_vector_search(embedding_model=self.query_embeddings)
+        )
+
+    @property
+    def emotion_classifier(self) -> Any:
+        from src.llm.core.emotion_classifier import LocalEmotionClassifier
+        return self._get("emotion_classifier", LocalEmotionClassifier)
+
+    @property
+    def conversation_agent(self) -> Any:
+        # Imported here because the agents pull their defaults from this registry
+        from src.llm.agents.conversation_agent import ConversationAgent
+        return self._get("conversation_agent", ConversationAgent)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Counters from components that have been built; never builds one"""
+        metrics: Dict[str, Any] = {}
+        llm = self._components.get("llm")
+        if llm is not None and llm._cache is not None:
+            metrics["llm_cache"] = llm._cache.stats()
+        query_embeddings = self._components.get("query_embeddings")
+        if query_embeddings is not None:
+            metrics["query_embedding_cache"] = query_embeddings.stats()
+        redis_connection = self._components.get("redis") or RedisConnection._instance
+        if redis_connection is not None:
+            metrics["redis_pools"] = redis_connection.pool_stats()
+        session_sweeper = self._components.get("session_sweeper")
+        if session_sweeper is not None:
+            metrics["session_sweeper"] = session_sweeper.stats()
+        return metrics
+
+    def preload(self) -> None:
+        """
+        Load the embedding model and FAISS index in a parent process before
+        workers are forked, so their pages are shared copy-on-write. No
+        inference and no Redis connections happen here, since thread pools
+        and sockets must not be inherited across fork.
+        """
+        self.vector_search
+        self.logger.log_interaction(
+            interaction_type="registry_preload",
+            data={"components": sorted(self._components)},
+            level=logging.INFO
+        )
+
+    def warmup(self) -> None:
+        """Eagerly build every component so the first request pays no load cost"""
+        self.redis
+        self.conversation_agent
+        if settings.SESSION_SWEEP_ENABLED:
+            # Every worker starts one; only the lease holder sweeps
+            self.session_sweeper.start()
+        # Run one query through the embedding model to initialise its kernels
+        self.vector_search.search("warmup", k=1)
+        self.logger.log_interaction(
+            interaction_type="registry_warmup",
+            data={"components": sorted(self._components)},
+            level=logging.INFO
+        )
+
+    async def shutdown(self) -> None:
+        """Release pooled connections and background workers"""
+        classifier = self._components.get("emotion_classifier")
+        if classifier is not None:
+            await classifier.close()
+
+        session_sweeper = self._components.get("session_sweeper")
+        if session_sweeper is not None:
+            # Stops between SCAN batches
+            await asyncio.to_thread(session_sweeper.stop)
+
+        vector_search = self._components.get("vector_search")
+        if vector_search is not None:
+            # Flushes buffered additions to disk
+            await asyncio.to_thread(vector_search.close)
+
+        # Memory classes reach the singleton directly, so it may exist even
+        # if the registry never handed it out
+        redis_connection = self._components.get("redis") or RedisConnection._instance
+        if redis_connection is not None:
+            await redis_connection.aclose()
+            redis_connection.close()
+
+        self.logger.log_interaction(
+            interaction_type="registry_shutdown",
+            data={"components": sorted(self._components)},
+            level=logging.INFO
+        )
+        self._components.clear()
+
+registry = ComponentRegistry()
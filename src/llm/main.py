@@ -1,5 +1,5 @@
 import logging
-from src.llm.agents.conversation_agent import ConversationAgent
+from src.llm.core.registry import registry
 from src.llm.utils.logging import TheryBotLogger
 from src.llm.core.config import settings
 
@@ -8,7 +8,7 @@ def main():
     logger = TheryBotLogger()
     
     # Initialize main conversation agent
-    agent = ConversationAgent()
+    agent = registry.conversation_agent
     
     # Example interaction
     query = "But I have been try to do this for quite a while now and I am still not able to get it right."
@@ -0,0 +1,174 @@
+import argparse
+import json
+import math
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+
+META_FILE = "bm25.json"
+ARRAY_FILES = {
+    "indptr": "bm25.indptr.npy",
+    "docs": "bm25.docs.npy",
+    "tfs": "bm25.tfs.npy",
+    "doc_lengths": "bm25.doclens.npy",
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i if in into is it its "
+    "me my of on or our she so that the their them then there these they this to was "
+    "we were what when which who will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over the chunks of a FAISS store, keyed by FAISS position.
+
+    Postings are kept in CSR form: for term id t, `docs[indptr[t]:indptr[t+1]]`
+    are the positions containing it and `tfs` the matching term frequencies.
+    The arrays are saved as .npy files next to the index and can be
+    memory-mapped like the compact docstore.
+    """
+
+    def __init__(
+        self,
+        vocab: Dict[str, int],
+        indptr: np.ndarray,
+        docs: np.ndarray,
+        tfs: np.ndarray,
+        doc_lengths: np.ndarray,
+        k1: float = 1.2,
+        b: float = 0.75
+    ):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.docs = docs
+        self.tfs = tfs
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    @classmethod
+    def build(cls, texts: Iterable[str], k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        """Index texts in order, so text i gets position i"""
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        doc_lengths = []
+        for position, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append((position, tf))
+
+        vocab = {term: term_id for term_id, term in enumerate(sorted(postings))}
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        docs, tfs = [], []
+        for term, term_id in vocab.items():
+            entries = postings[term]
+            indptr[term_id + 1] = indptr[term_id] + len(entries)
+            docs.extend(position for position, _ in entries)
+            tfs.extend(tf for _, tf in entries)
+
+        return cls(
+            vocab,
+            indptr,
+            np.asarray(docs, dtype=np.int32),
+            np.minimum(np.asarray(tfs, dtype=np.int64), np.iinfo(np.uint16).max).astype(np.uint16),
+            np.asarray(doc_lengths, dtype=np.float32),
+            k1=k1,
+            b=b
+        )
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore) -> "BM25Index":
+        def texts() -> Iterable[str]:
+            for position in range(vectorstore.index.ntotal):
+                doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+                yield getattr(doc, "page_content", "")
+        return cls.build(texts())
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Top-k (position, score) pairs, best first; empty if no term matches"""
+        if not len(self):
+            return []
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = int(self.indptr[term_id]), int(self.indptr[term_id + 1])
+            docs = self.docs[start:end]
+            tfs = self.tfs[start:end].astype(np.float32)
+            df = end - start
+            idf = math.log(1 + (len(self) - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / self.avg_length)
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k)[:k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(int(position), float(scores[position])) for position in matched]
+
+    @staticmethod
+    def exists(directory: Path) -> bool:
+        return (Path(directory) / META_FILE).exists()
+
+    def save(self, directory: Path) -> None:
+        """Arrays first and metadata last, each swapped in atomically"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, file_name in ARRAY_FILES.items():
+            tmp_path = directory / (file_name + ".tmp")
+            with open(tmp_path, "wb") as f:
+                np.save(f, getattr(self, name))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, directory / file_name)
+
+        tmp_path = directory / (META_FILE + ".tmp")
+        tmp_path.write_text(json.dumps({"k1": self.k1, "b": self.b, "vocab": self.vocab}))
+        os.replace(tmp_path, directory / META_FILE)
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = False) -> "BM25Index":
+        directory = Path(directory)
+        meta = json.loads((directory / META_FILE).read_text())
+        arrays = {
+            name: np.load(directory / file_name, mmap_mode="r" if mmap else None)
+            for name, file_name in ARRAY_FILES.items()
+        }
+        return cls(meta["vocab"], k1=meta["k1"], b=meta["b"], **arrays)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the BM25 keyword index for a saved FAISS store")
+    parser.add_argument("db_path", type=Path)
+    args = parser.parse_args()
+
+    from langchain_community.vectorstores import FAISS
+    from src.llm.memory.vector_store import default_embedding_model
+
+    vectorstore = FAISS.load_local(
+        str(args.db_path),
+        default_embedding_model(),
+        allow_dangerous_deserialization=True
+    )
+    bm25 = BM25Index.from_vectorstore(vectorstore)
+    bm25.save(args.db_path)
+    print(f"Indexed {len(bm25)} chunks, {len(bm25.vocab)} terms in {args.db_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+
+DELTA_DIR = "deltas"
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = ".lock"
+
+
+class DeltaStore:
+    """
+    Append-only in-memory segment of recently added chunks, searched by brute
+    force next to the base index until it is compacted into it.
+
+    Each add publishes a new vectors array instead of growing one in place,
+    so concurrent searches keep reading a consistent snapshot without locks.
+    """
+    # No keyword index; hybrid search fuses only the base store's BM25 hits
+    bm25 = None
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self._ids: List[str] = []
+        self._docs: List[Document] = []
+        self._vectors = np.empty((0, dimension), dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+    def add(self, ids: List[str], docs: List[Document], vectors: np.ndarray) -> None:
+        with self._lock:
+            # Documents first, so a published vector always has its document
+            self._ids.extend(ids)
+            self._docs.extend(docs)
+            self._vectors = np.vstack([self._vectors, np.asarray(vectors, dtype=np.float32)])
+
+    def slice(self, start: int, end: int) -> Tuple[List[str], List[Document], np.ndarray]:
+        return self._ids[start:end], self._docs[start:end], self._vectors[start:end]
+
+    def dense_candidates(self, vector: np.ndarray, n: int) -> List[Tuple[int, float]]:
+        """(position, squared L2 distance) pairs, nearest first, as FAISS reports them"""
+        vectors = self._vectors
+        if not len(vectors):
+            return []
+        distances = ((vectors - vector[0]) ** 2).sum(axis=1)
+        n = min(n, len(distances))
+        nearest = np.argpartition(distances, n - 1)[:n]
+        nearest = nearest[np.argsort(distances[nearest], kind="stable")]
+        return [(int(position), float(distances[position])) for position in nearest]
+
+    def document_at(self, position: int) -> Optional[Document]:
+        return self._docs[position]
+
+
+class DeltaLog:
+    """
+    Durable log of flushed delta segments under <db>/deltas, shared by every
+    worker process writing to the same index.
+
+    A segment is fully written and fsynced before the manifest listing it is
+    atomically replaced, so after a crash the manifest only names complete
+    segments; files it does not list are leftovers and are ignored.
+
+    Manifest updates and compactions run under an exclusive flock on
+    <db>/deltas/.lock (see `locked`); the *_locked methods expect the caller
+    to hold it. The manifest's generation counts compactions, so a process
+    can tell that the base index on disk has been rewritten.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Exclusive across processes, and across threads (one open file each)"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / LOCK_FILE, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def manifest(self) -> dict:
+        path = self.directory / MANIFEST_FILE
+        if not path.exists():
+            return {"segments": [], "next": 1, "generation": 0}
+        manifest = json.loads(path.read_text())
+        manifest.setdefault("generation", 0)
+        return manifest
+
+    def stamp(self) -> Optional[Tuple[int, int]]:
+        """Changes whenever the manifest is replaced; a cheap check before locking"""
+        try:
+            stat = os.stat(self.directory / MANIFEST_FILE)
+            return stat.st_ino, stat.st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _write_manifest(self, manifest: dict) -> None:
+        tmp_path = self.directory / (MANIFEST_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.directory / MANIFEST_FILE)
+
+    def segments(self) -> List[str]:
+        return list(self.manifest()["segments"])
+
+    def append(self, ids: List[str], docs: List[Document], vectors: np.ndarray) -> str:
+        with self.locked():
+            return self.append_locked(ids, docs, vectors)
+
+    def append_locked(self, ids: List[str], docs: List[Document], vectors: np.ndarray) -> str:
+        manifest = self.manifest()
+        name = f"segment-{manifest['next']:08d}.npz"
+        records = json.dumps(
+            [{"id": i, "text": d.page_content, "metadata": d.metadata} for i, d in zip(ids, docs)],
+            ensure_ascii=False
+        ).encode("utf-8")
+
+        tmp_path = self.directory / (name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, vectors=np.asarray(vectors, dtype=np.float32), records=np.frombuffer(records, dtype=np.uint8))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.directory / name)
+
+        manifest["segments"].append(name)
+        manifest["next"] += 1
+        self._write_manifest(manifest)
+        return name
+
+    def read(self, segments: Optional[List[str]] = None) -> Iterator[Tuple[List[str], List[Document], np.ndarray]]:
+        for name in self.segments() if segments is None else segments:
+            with np.load(self.directory / name) as segment:
+                records = json.loads(segment["records"].tobytes())
+                vectors = segment["vectors"]
+            yield (
+                [r["id"] for r in records],
+                [Document(page_content=r["text"], metadata=r["metadata"]) for r in records],
+                vectors
+            )
+
+    def truncate_locked(self, segments: List[str]) -> int:
+        """
+        Drop segments compacted into a newly saved base: manifest first, then
+        their files. Returns the new generation.
+        """
+        manifest = self.manifest()
+        manifest["segments"] = [name for name in manifest["segments"] if name not in set(segments)]
+        manifest["generation"] += 1
+        self._write_manifest(manifest)
+        for name in segments:
+            try:
+                os.remove(self.directory / name)
+            except FileNotFoundError:
+                pass
+        return manifest["generation"]
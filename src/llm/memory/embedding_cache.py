@@ -0,0 +1,128 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from .redis_connection import RedisConnection
+from src.llm.core.config import settings
+from src.llm.utils.logging import TheryBotLogger
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that memoises query vectors.
+
+    Queries are keyed on normalised text (lower-cased, whitespace collapsed;
+    all-MiniLM-L6-v2 is uncased so this does not change the vector). Lookups
+    go to a bounded in-process LRU first and then, if `redis_ttl` is set, to
+    Redis, where vectors are stored as raw float32 bytes. Document embedding
+    is passed straight through.
+    """
+    KEY_PREFIX = "qemb"
+
+    def __init__(
+        self,
+        base: Embeddings,
+        max_size: int = settings.EMBEDDING_CACHE_SIZE,
+        redis_ttl: int = settings.EMBEDDING_CACHE_REDIS_TTL,
+        logger: Optional[TheryBotLogger] = None
+    ):
+        self.base = base
+        self.max_size = max_size
+        self.redis_ttl = redis_ttl
+        self.logger = logger or TheryBotLogger()
+        self.namespace = getattr(base, "model_name", type(base).__name__)
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "redis_hits": 0, "misses": 0}
+        # Redis is resolved on first lookup so preloading before fork opens no sockets
+        self._redis = None
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(text.lower().split())
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self.normalize(text)
+
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self._stats["hits"] += 1
+                return list(vector)
+
+        vector = self._redis_get(key)
+        if vector is not None:
+            self._count("redis_hits")
+        else:
+            self._count("misses")
+            vector = self.base.embed_query(text)
+            self._redis_set(key, vector)
+
+        self._remember(key, vector)
+        return list(vector)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats, size=len(self._cache), max_size=self.max_size)
+        lookups = stats["hits"] + stats["redis_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["redis_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        with self._lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
+
+    def _redis_key(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return f"{self.KEY_PREFIX}:{self.namespace}:{digest}"
+
+    def _redis_client(self) -> Any:
+        if self.redis_ttl and self._redis is None:
+            self._redis = RedisConnection().binary_client
+        return self._redis
+
+    def _redis_get(self, key: str) -> Optional[List[float]]:
+        if not self.redis_ttl:
+            return None
+        try:
+            data = self._redis_client().get(self._redis_key(key))
+        except Exception as e:
+            self._log_error("get", e)
+            return None
+        return np.frombuffer(data, dtype=np.float32).tolist() if data else None
+
+    def _redis_set(self, key: str, vector: List[float]) -> None:
+        if not self.redis_ttl:
+            return
+        try:
+            self._redis_client().set(
+                self._redis_key(key),
+                np.asarray(vector, dtype=np.float32).tobytes(),
+                ex=self.redis_ttl
+            )
+        except Exception as e:
+            self._log_error("set", e)
+
+    def _log_error(self, operation: str, error: Exception) -> None:
+        self.logger.log_interaction(
+            interaction_type="embedding_cache_error",
+            data={"operation": operation, "error": str(error)},
+            level=logging.WARNING
+        )
@@ -1,67 +1,370 @@
-import json
 import time
+import uuid
 from datetime import timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from .redis_connection import RedisConnection
+from .record_codec import decode_record, encode_record
 from src.llm.models.schemas import ConversationResponse
 from src.llm.core.config import settings
 
+# Gemini averages about four characters per token on English text, which is
+# close enough for budgeting without a tokenizer call
+CHARS_PER_TOKEN = 4
+
+# Release the summary lock only if this summariser still holds it; after its
+# TTL lapsed another worker may have taken it
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Store a summary and drop the rendered turns it covers (ARGV[3..]) from the
+# head of the context list, atomically. Appends may have trimmed the oldest
+# of those turns in the meantime, so the longest suffix of them still at the
+# head is dropped; if none is, the list has moved on and nothing is written
+FOLD_SUMMARY_SCRIPT = """
+local n = #ARGV - 2
+local head = redis.call('LRANGE', KEYS[1], 0, n - 1)
+for k = 0, n - 1 do
+    local m = n - k
+    if #head >= m then
+        local match = true
+        for i = 1, m do
+            if head[i] ~= ARGV[2 + k + i] then
+                match = false
+                break
+            end
+        end
+        if match then
+            redis.call('SET', KEYS[2], ARGV[1], 'EX', ARGV[2])
+            redis.call('LTRIM', KEYS[1], m, -1)
+            return 1
+        end
+    end
+end
+return 0
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
 class RedisHistory:
-    def __init__(self, session_ttl: int = settings.SESSION_TTL):
-        self.redis = RedisConnection().client
+    """
+    Conversation history per session: `session:{id}:history` holds the full
+    records and `session:{id}:context` the same turns pre-rendered for the
+    prompt, appended in the same pipeline so prompt building is one round trip.
+
+    The prompt gets the newest rendered turns that fit the token budget, after
+    `session:{id}:summary`, a rolling summary of older turns. Turns leave the
+    context list only once SummaryAgent has folded them into that summary.
+    """
+
+    def __init__(
+        self,
+        session_ttl: int = settings.SESSION_TTL,
+        context_turns: int = settings.HISTORY_CONTEXT_TURNS,
+        token_budget: int = settings.HISTORY_TOKEN_BUDGET,
+        summarize: bool = settings.HISTORY_SUMMARY_ENABLED,
+        max_turns: int = settings.HISTORY_MAX_TURNS
+    ):
+        connection = RedisConnection()
+        # Entries are binary records
+        self.redis = connection.binary_client
+        self.async_redis = connection.async_binary_client
         self.session_ttl = session_ttl
+        self.context_turns = context_turns
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary_tokens = settings.HISTORY_SUMMARY_MAX_TOKENS if summarize else 0
+        self.summary_batch = settings.HISTORY_SUMMARY_BATCH
+        # Without a summariser nothing would ever consume the backlog
+        self.max_context_lines = context_turns + (settings.HISTORY_SUMMARY_BACKLOG if summarize else 0)
+        # Scripts run via EVALSHA and reload themselves on NOSCRIPT
+        self._release_lock = self.redis.register_script(RELEASE_LOCK_SCRIPT)
+        self._release_lock_async = self.async_redis.register_script(RELEASE_LOCK_SCRIPT)
+        self._fold_summary = self.redis.register_script(FOLD_SUMMARY_SCRIPT)
+        self._fold_summary_async = self.async_redis.register_script(FOLD_SUMMARY_SCRIPT)
 
     def add_conversation(self, session_id: str, chat_id: str, response: ConversationResponse) -> None:
         """
         Store complete conversation response in history
         """
-        # Store in session-specific list
-        self.redis.rpush(
-            f"session:{session_id}:history",
-            json.dumps({
-                'chat_id': chat_id,
-                'response': response.dict(),
-                'timestamp': time.time()
-            })
-        )
-        
-        # Set TTL for session history
-        self.redis.expire(f"session:{session_id}:history", self.session_ttl)
-    
-    def get_conversation_history(self, session_id: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """
-        Retrieve conversation history with optional limit
-        """
-        messages = self.redis.lrange(f"session:{session_id}:history", -limit, -1)
-        return [
-            {
-                'chat_id': json.loads(msg)['chat_id'],
-                'response': ConversationResponse(**json.loads(msg)['response']),
-                'timestamp': json.loads(msg)['timestamp']
-            }
-            for msg in messages
-        ]
-    
+        # Append and refresh the TTL in one round trip
+        trimmed = self._queue_append(self.redis.pipeline(transaction=False), session_id, chat_id, response).execute()[1]
+        if trimmed:
+            # Chat records go with the history entries trimmed above
+            self.redis.hdel(f"session:{session_id}:chats", *self._entry_chat_ids(trimmed))
+
+    async def add_conversation_async(self, session_id: str, chat_id: str, response: ConversationResponse) -> None:
+        """
+        Async version of add_conversation
+        """
+        pipe = self.async_redis.pipeline(transaction=False)
+        trimmed = (await self._queue_append(pipe, session_id, chat_id, response).execute())[1]
+        if trimmed:
+            await self.async_redis.hdel(f"session:{session_id}:chats", *self._entry_chat_ids(trimmed))
+
+    def get_conversation_history(
+        self,
+        session_id: str,
+        limit: int = 10,
+        with_context: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve conversation history with optional limit; retrieval context
+        is read back from the session's chats hash unless `with_context` is off
+        """
+        entries = [decode_record(msg) for msg in self.redis.lrange(f"session:{session_id}:history", -limit, -1)]
+        chat_ids = self._chat_ids_without_context(entries) if with_context else []
+        chats = self.redis.hmget(f"session:{session_id}:chats", chat_ids) if chat_ids else []
+        return self._build_entries(entries, dict(zip(chat_ids, chats)))
+
+    async def get_conversation_history_async(
+        self,
+        session_id: str,
+        limit: int = 10,
+        with_context: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Async version of get_conversation_history
+        """
+        entries = [decode_record(msg) for msg in await self.async_redis.lrange(f"session:{session_id}:history", -limit, -1)]
+        chat_ids = self._chat_ids_without_context(entries) if with_context else []
+        chats = await self.async_redis.hmget(f"session:{session_id}:chats", chat_ids) if chat_ids else []
+        return self._build_entries(entries, dict(zip(chat_ids, chats)))
+
     def get_full_context(self, session_id: str) -> str:
         """
         Generate conversation context string for LLM prompts
         """
-        history = self.get_conversation_history(session_id)
-        context_lines = []
-        
-        for entry in history:
-            response = entry['response']
-            context_lines.append(
-                f"User: {response.query}\n"
-                f"Therapist: {response.response}\n"
-                f"Emotions: {response.emotion_analysis.primary_emotion} "
-                f"(Intensity: {response.emotion_analysis.intensity})\n"
-            )
-        
-        return "\n".join(context_lines)
-    
+        pipe = self.redis.pipeline(transaction=False)
+        summary, lines, history_length = self._queue_context_read(pipe, session_id).execute()
+        lines = self._decode_lines(lines)
+        if not lines and history_length:
+            lines = self._rebuild_context(session_id)
+        return self._build_context(summary, lines)
+
+    async def get_full_context_async(self, session_id: str) -> str:
+        """
+        Async version of get_full_context
+        """
+        pipe = self.async_redis.pipeline(transaction=False)
+        summary, lines, history_length = await self._queue_context_read(pipe, session_id).execute()
+        lines = self._decode_lines(lines)
+        if not lines and history_length:
+            lines = await self._rebuild_context_async(session_id)
+        return self._build_context(summary, lines)
+
+    def get_summary_backlog(self, session_id: str) -> Tuple[str, List[str]]:
+        """
+        Current summary and the rendered turns due to be folded into it; the
+        list is empty until at least a batch has left the prompt window
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        summary, lines = self._queue_backlog_read(pipe, session_id).execute()
+        return self._backlog(summary, lines)
+
+    async def get_summary_backlog_async(self, session_id: str) -> Tuple[str, List[str]]:
+        """
+        Async version of get_summary_backlog
+        """
+        pipe = self.async_redis.pipeline(transaction=False)
+        summary, lines = await self._queue_backlog_read(pipe, session_id).execute()
+        return self._backlog(summary, lines)
+
+    def store_summary(self, session_id: str, summary: str, folded: List[str]) -> bool:
+        """
+        Replace the summary and drop the `folded` turns (from get_summary_backlog)
+        it now covers. False if the context list no longer starts with them
+        """
+        # One script, so a prompt never sees the turns both summarised and verbatim
+        return bool(self._fold_summary(keys=self._summary_keys(session_id), args=[summary, self.session_ttl, *folded]))
+
+    async def store_summary_async(self, session_id: str, summary: str, folded: List[str]) -> bool:
+        """
+        Async version of store_summary
+        """
+        return bool(await self._fold_summary_async(keys=self._summary_keys(session_id), args=[summary, self.session_ttl, *folded]))
+
+    def acquire_summary_lock(self, session_id: str, timeout: int = settings.HISTORY_SUMMARY_LOCK_TIMEOUT) -> Optional[str]:
+        """
+        One summariser per session across workers; expires if its holder dies.
+        Returns the holder's token for release_summary_lock, or None if taken
+        """
+        token = uuid.uuid4().hex
+        return token if self.redis.set(f"session:{session_id}:summary:lock", token, nx=True, ex=timeout) else None
+
+    async def acquire_summary_lock_async(self, session_id: str, timeout: int = settings.HISTORY_SUMMARY_LOCK_TIMEOUT) -> Optional[str]:
+        """
+        Async version of acquire_summary_lock
+        """
+        token = uuid.uuid4().hex
+        return token if await self.async_redis.set(f"session:{session_id}:summary:lock", token, nx=True, ex=timeout) else None
+
+    def release_summary_lock(self, session_id: str, token: str) -> None:
+        self._release_lock(keys=[f"session:{session_id}:summary:lock"], args=[token])
+
+    async def release_summary_lock_async(self, session_id: str, token: str) -> None:
+        await self._release_lock_async(keys=[f"session:{session_id}:summary:lock"], args=[token])
+
     def clear_history(self, session_id: str) -> None:
         """
         Clear session history
         """
-        self.redis.delete(f"session:{session_id}:history")
\ No newline at end of file
+        self.redis.delete(*self._history_keys(session_id))
+
+    async def clear_history_async(self, session_id: str) -> None:
+        """
+        Async version of clear_history
+        """
+        await self.async_redis.delete(*self._history_keys(session_id))
+
+    @staticmethod
+    def _history_keys(session_id: str) -> Tuple[str, ...]:
+        return (
+            f"session:{session_id}:history",
+            f"session:{session_id}:context",
+            f"session:{session_id}:summary",
+        )
+
+    def _queue_append(self, pipe: Any, session_id: str, chat_id: str, response: ConversationResponse) -> Any:
+        # Store in session-specific list
+        pipe.rpush(f"session:{session_id}:history", self._serialize_entry(chat_id, response))
+        # Second result: the entries the trim below drops, so their chat
+        # records can be dropped too and the chats hash stays capped
+        pipe.lrange(f"session:{session_id}:history", 0, -self.max_turns - 1)
+        pipe.ltrim(f"session:{session_id}:history", -self.max_turns, -1)
+        # Set TTL for session history
+        pipe.expire(f"session:{session_id}:history", self.session_ttl)
+        self._queue_context_lines(pipe, session_id, [self._render_turn(response)])
+        # The summary lives as long as the turns it stands in for
+        pipe.expire(f"session:{session_id}:summary", self.session_ttl)
+        return pipe
+
+    def _queue_context_lines(self, pipe: Any, session_id: str, lines: List[str]) -> Any:
+        key = f"session:{session_id}:context"
+        if lines:
+            pipe.rpush(key, *lines)
+        pipe.ltrim(key, -self.max_context_lines, -1)
+        pipe.expire(key, self.session_ttl)
+        return pipe
+
+    def _queue_context_read(self, pipe: Any, session_id: str) -> Any:
+        pipe.get(f"session:{session_id}:summary")
+        pipe.lrange(f"session:{session_id}:context", -self.context_turns, -1)
+        # A history without a context list predates the cache
+        pipe.llen(f"session:{session_id}:history")
+        return pipe
+
+    def _queue_backlog_read(self, pipe: Any, session_id: str) -> Any:
+        pipe.get(f"session:{session_id}:summary")
+        pipe.lrange(f"session:{session_id}:context", 0, -1)
+        return pipe
+
+    @staticmethod
+    def _summary_keys(session_id: str) -> List[str]:
+        return [f"session:{session_id}:context", f"session:{session_id}:summary"]
+
+    def _backlog(self, summary: Optional[bytes], lines: List[bytes]) -> Tuple[str, List[str]]:
+        lines = self._decode_lines(lines)
+        # Fold whatever the prompt window cannot hold at the summary's full size
+        # (the latest turn stays verbatim, truncated if need be)
+        kept = max(len(self._select_recent(lines, self.token_budget - self.summary_tokens)), min(len(lines), 1))
+        folded = len(lines) - kept
+        if folded < self.summary_batch:
+            folded = 0
+        return (summary.decode("utf-8") if summary else ""), lines[:folded]
+
+    def _build_context(self, summary: Optional[bytes], lines: List[str]) -> str:
+        parts = []
+        budget = self.token_budget
+        if summary:
+            summary_text = self._truncate(summary.decode("utf-8"), self.summary_tokens or self.token_budget)
+            parts.append(f"Summary of earlier conversation: {summary_text}\n")
+            budget -= estimate_tokens(parts[0])
+        recent = self._select_recent(lines, budget)
+        if lines and not recent:
+            # The latest turn is always included, cut down to the budget
+            recent = [self._truncate(lines[-1], max(budget, 0))]
+        return "\n".join(parts + recent)
+
+    def _select_recent(self, lines: List[str], budget: int) -> List[str]:
+        """The newest lines, up to context_turns of them, whose estimated tokens fit `budget`"""
+        selected = []
+        for line in reversed(lines[-self.context_turns:]):
+            cost = estimate_tokens(line)
+            if cost > budget:
+                break
+            selected.append(line)
+            budget -= cost
+        return selected[::-1]
+
+    @staticmethod
+    def _truncate(text: str, tokens: int) -> str:
+        if estimate_tokens(text) <= tokens:
+            return text
+        return text[:tokens * CHARS_PER_TOKEN].rstrip() + "..."
+
+    def _rebuild_context(self, session_id: str) -> List[str]:
+        lines = [
+            self._render_turn(entry['response'])
+            for entry in self.get_conversation_history(session_id, limit=self.context_turns, with_context=False)
+        ]
+        self._queue_context_lines(self.redis.pipeline(transaction=False), session_id, lines).execute()
+        return lines
+
+    async def _rebuild_context_async(self, session_id: str) -> List[str]:
+        lines = [
+            self._render_turn(entry['response'])
+            for entry in await self.get_conversation_history_async(session_id, limit=self.context_turns, with_context=False)
+        ]
+        await self._queue_context_lines(self.async_redis.pipeline(transaction=False), session_id, lines).execute()
+        return lines
+
+    @staticmethod
+    def _decode_lines(lines: List[bytes]) -> List[str]:
+        return [line.decode("utf-8") for line in lines]
+
+    def _serialize_entry(self, chat_id: str, response: ConversationResponse) -> bytes:
+        # The retrieval context lives once in the session's chats hash, keyed
+        # by chat_id, and is joined back in by get_conversation_history
+        return encode_record({
+            'chat_id': chat_id,
+            'response': response.dict(exclude={'context'}),
+            'timestamp': time.time()
+        })
+
+    @staticmethod
+    def _entry_chat_ids(entries: List[bytes]) -> List[str]:
+        return [decode_record(entry)['chat_id'] for entry in entries]
+
+    @staticmethod
+    def _chat_ids_without_context(entries: List[Dict[str, Any]]) -> List[str]:
+        # Legacy JSON entries still carry their own context
+        return [entry['chat_id'] for entry in entries if 'context' not in entry['response']]
+
+    def _build_entries(self, entries: List[Dict[str, Any]], chats: Dict[str, Optional[bytes]]) -> List[Dict[str, Any]]:
+        built = []
+        for entry in entries:
+            response = entry['response']
+            chat = chats.get(entry['chat_id'])
+            if chat:
+                response = {**response, 'context': decode_record(chat)['response'].get('context', {})}
+            built.append({
+                'chat_id': entry['chat_id'],
+                'response': ConversationResponse(**response),
+                'timestamp': entry['timestamp']
+            })
+        return built
+
+    def _render_turn(self, response: ConversationResponse) -> str:
+        return (
+            f"User: {response.query}\n"
+            f"Therapist: {response.response}\n"
+            f"Emotions: {response.emotion_analysis.primary_emotion} "
+            f"(Intensity: {response.emotion_analysis.intensity})\n"
+        )
@@ -0,0 +1,102 @@
+import json
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Any, ClassVar, Optional
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "pq", "ivfpq")
+
+
+@dataclass
+class IndexSpec:
+    """
+    FAISS index type and tuning parameters, persisted next to the index as
+    index_spec.json so search uses the same settings the builder chose.
+
+    flat   exact search (default)
+    ivf    inverted lists; nlist clusters, nprobe probed per query
+    hnsw   graph index; hnsw_m links per node, ef_search candidates per query
+    pq     product quantization; pq_m sub-vectors of pq_nbits each
+    ivfpq  inverted lists over product-quantized codes
+    """
+    FILE_NAME: ClassVar[str] = "index_spec.json"
+
+    index_type: str = "flat"
+    nlist: int = 256
+    nprobe: int = 16
+    hnsw_m: int = 32
+    ef_construction: int = 80
+    ef_search: int = 64
+    pq_m: int = 16
+    pq_nbits: int = 8
+
+    def __post_init__(self):
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type {self.index_type!r}, expected one of {INDEX_TYPES}")
+
+    @property
+    def requires_training(self) -> bool:
+        return self.index_type in ("ivf", "pq", "ivfpq")
+
+    def factory_string(self) -> str:
+        return {
+            "flat": "Flat",
+            "ivf": f"IVF{self.nlist},Flat",
+            "hnsw": f"HNSW{self.hnsw_m}",
+            "pq": f"PQ{self.pq_m}x{self.pq_nbits}",
+            "ivfpq": f"IVF{self.nlist},PQ{self.pq_m}x{self.pq_nbits}",
+        }[self.index_type]
+
+    def fitted_to(self, num_vectors: int) -> "IndexSpec":
+        """
+        Shrink the spec to what num_vectors can train: nlist so every cluster
+        gets enough points (FAISS wants ~39 each), and pq_nbits so the PQ
+        codebooks' 2**pq_nbits centroids each get at least one. Too few
+        vectors for any codebook falls back to flat.
+        """
+        spec = self
+        if spec.index_type in ("ivf", "ivfpq"):
+            nlist = max(1, min(spec.nlist, num_vectors // 39))
+            if nlist != spec.nlist:
+                spec = replace(spec, nlist=nlist, nprobe=min(spec.nprobe, nlist))
+        if spec.index_type in ("pq", "ivfpq"):
+            pq_nbits = min(spec.pq_nbits, max(num_vectors, 1).bit_length() - 1)
+            if pq_nbits < 1:
+                return replace(spec, index_type="flat")
+            if pq_nbits != spec.pq_nbits:
+                spec = replace(spec, pq_nbits=pq_nbits)
+        return spec
+
+    def build_index(self, dimension: int) -> Any:
+        import faiss
+
+        # L2 matches langchain's default; on normalized embeddings it ranks like cosine
+        index = faiss.index_factory(dimension, self.factory_string(), faiss.METRIC_L2)
+        if self.index_type == "hnsw":
+            index.hnsw.efConstruction = self.ef_construction
+        return index
+
+    def apply_search_params(
+        self,
+        index: Any,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None
+    ) -> None:
+        """Set query-time knobs, with optional overrides of the persisted values"""
+        import faiss
+
+        if self.index_type in ("ivf", "ivfpq"):
+            faiss.ParameterSpace().set_index_parameter(index, "nprobe", nprobe or self.nprobe)
+        elif self.index_type == "hnsw":
+            faiss.ParameterSpace().set_index_parameter(index, "efSearch", ef_search or self.ef_search)
+
+    def save(self, directory: Path) -> None:
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        (Path(directory) / self.FILE_NAME).write_text(json.dumps(asdict(self), indent=2))
+
+    @classmethod
+    def load(cls, directory: Path) -> "IndexSpec":
+        """Read the persisted spec; indexes built before specs existed are flat"""
+        path = Path(directory) / cls.FILE_NAME
+        if not path.exists():
+            return cls()
+        return cls(**json.loads(path.read_text()))
@@ -1,71 +1,150 @@
 from typing import Dict, Any, Optional
 from .redis_connection import RedisConnection
+from .record_codec import decode_record, encode_record
 from src.llm.models.schemas import ConversationResponse
+from src.llm.core.config import settings
 import json
 import time
 
 class RedisMemoryManager:
-    def __init__(self):
-        self.redis = RedisConnection().client
-    
-    def store_conversation(self, session_id: str, chat_id: str, response: ConversationResponse) -> None:
+    def __init__(self, session_ttl: int = settings.SESSION_TTL):
+        connection = RedisConnection()
+        self.session_ttl = session_ttl
+        self.redis = connection.client
+        self.async_redis = connection.async_client
+        # Chat records are binary; the session and state hashes stay text
+        self.binary_redis = connection.binary_client
+        self.async_binary_redis = connection.async_binary_client
+
+    def store_conversation(
+        self,
+        session_id: str,
+        chat_id: str,
+        response: ConversationResponse,
+        user_id: Optional[str] = None
+    ) -> None:
         """
-        Store complete conversation response with metadata
+        Store complete conversation response with metadata; with `user_id`,
+        the user's session set shares the refreshed TTL
         """
-        response_data = response.dict()
-        timestamp = time.time()
-        
-        # Store in session-specific hash
-        self.redis.hset(
-            f"session:{session_id}:chats",
-            chat_id,
-            json.dumps({
-                'response': response_data,
-                'timestamp': timestamp
-            })
-        )
-        
-        # Update session metadata
-        self.redis.hset(
-            f"session:{session_id}",
-            mapping={
-                'last_chat_id': chat_id,
-                'last_updated': str(timestamp)
-            }
-        )
-    
+        # Both writes in one round trip
+        self._queue_store(self.binary_redis.pipeline(transaction=False), session_id, chat_id, response, user_id).execute()
+
+    async def store_conversation_async(
+        self,
+        session_id: str,
+        chat_id: str,
+        response: ConversationResponse,
+        user_id: Optional[str] = None
+    ) -> None:
+        """
+        Async version of store_conversation
+        """
+        pipe = self.async_binary_redis.pipeline(transaction=False)
+        await self._queue_store(pipe, session_id, chat_id, response, user_id).execute()
+
     def get_conversation(self, session_id: str, chat_id: str) -> Optional[ConversationResponse]:
         """
         Retrieve specific conversation response
         """
-        data = self.redis.hget(f"session:{session_id}:chats", chat_id)
-        if data:
-            return ConversationResponse(**json.loads(data)['response'])
-        return None
-    
+        data = self.binary_redis.hget(f"session:{session_id}:chats", chat_id)
+        return self._deserialize_chat(data) if data else None
+
+    async def get_conversation_async(self, session_id: str, chat_id: str) -> Optional[ConversationResponse]:
+        """
+        Async version of get_conversation
+        """
+        data = await self.async_binary_redis.hget(f"session:{session_id}:chats", chat_id)
+        return self._deserialize_chat(data) if data else None
+
     def get_session_conversations(self, session_id: str) -> Dict[str, Any]:
         """
         Get all conversations for a session
         """
-        conversations = self.redis.hgetall(f"session:{session_id}:chats")
-        return {
-            chat_id: ConversationResponse(**json.loads(data)['response'])
-            for chat_id, data in conversations.items()
-        }
-    
+        conversations = self.binary_redis.hgetall(f"session:{session_id}:chats")
+        return {chat_id.decode(): self._deserialize_chat(data) for chat_id, data in conversations.items()}
+
+    async def get_session_conversations_async(self, session_id: str) -> Dict[str, Any]:
+        """
+        Async version of get_session_conversations
+        """
+        conversations = await self.async_binary_redis.hgetall(f"session:{session_id}:chats")
+        return {chat_id.decode(): self._deserialize_chat(data) for chat_id, data in conversations.items()}
+
     def update_emotional_state(self, session_id: str, emotions: Dict[str, Any]) -> None:
         """
         Update emotional state tracking
         """
-        self.redis.hset(
-            f"session:{session_id}:state",
-            'emotions',
-            json.dumps(emotions)
-        )
-    
+        self._queue_emotional_state(self.redis.pipeline(transaction=False), session_id, emotions).execute()
+
+    async def update_emotional_state_async(self, session_id: str, emotions: Dict[str, Any]) -> None:
+        """
+        Async version of update_emotional_state
+        """
+        pipe = self.async_redis.pipeline(transaction=False)
+        await self._queue_emotional_state(pipe, session_id, emotions).execute()
+
     def get_emotional_state(self, session_id: str) -> Dict[str, Any]:
         """
         Retrieve current emotional state
         """
         data = self.redis.hget(f"session:{session_id}:state", 'emotions')
-        return json.loads(data) if data else {}
\ No newline at end of file
+        return json.loads(data) if data else {}
+
+    async def get_emotional_state_async(self, session_id: str) -> Dict[str, Any]:
+        """
+        Async version of get_emotional_state
+        """
+        data = await self.async_redis.hget(f"session:{session_id}:state", 'emotions')
+        return json.loads(data) if data else {}
+
+    def _queue_store(
+        self,
+        pipe: Any,
+        session_id: str,
+        chat_id: str,
+        response: ConversationResponse,
+        user_id: Optional[str] = None
+    ) -> Any:
+        timestamp = time.time()
+        # Store in session-specific hash
+        pipe.hset(
+            f"session:{session_id}:chats",
+            chat_id,
+            self._serialize_chat(response, timestamp)
+        )
+        # Update session metadata
+        pipe.hset(
+            f"session:{session_id}",
+            mapping=self._session_update(chat_id, timestamp)
+        )
+        # Chats share the session's sliding TTL
+        for key in (f"session:{session_id}", f"session:{session_id}:chats", f"session:{session_id}:state"):
+            pipe.expire(key, self.session_ttl)
+        if user_id:
+            pipe.expire(f"user:{user_id}:sessions", self.session_ttl)
+        return pipe
+
+    def _queue_emotional_state(self, pipe: Any, session_id: str, emotions: Dict[str, Any]) -> Any:
+        pipe.hset(
+            f"session:{session_id}:state",
+            'emotions',
+            json.dumps(emotions)
+        )
+        pipe.expire(f"session:{session_id}:state", self.session_ttl)
+        return pipe
+
+    def _serialize_chat(self, response: ConversationResponse, timestamp: float) -> bytes:
+        return encode_record({
+            'response': response.dict(),
+            'timestamp': timestamp
+        })
+
+    def _deserialize_chat(self, data: bytes) -> ConversationResponse:
+        return ConversationResponse(**decode_record(data)['response'])
+
+    def _session_update(self, chat_id: str, timestamp: float) -> Dict[str, str]:
+        return {
+            'last_chat_id': chat_id,
+            'last_updated': str(timestamp)
+        }
@@ -0,0 +1,114 @@
+import argparse
+from typing import Dict
+import redis
+from src.llm.memory.record_codec import decode_record, encode_record, is_legacy
+from src.llm.memory.redis_connection import RedisConnection
+
+# Rewrite (field, old, new) triples of a hash, each only if the field still
+# holds the value that was read: a chat deleted or rewritten in the meantime
+# (e.g. trimmed with its history) is left alone rather than written back.
+# Returns 1 or 0 per triple
+REWRITE_FIELDS_SCRIPT = """
+local rewritten = {}
+for i = 1, #ARGV, 3 do
+    if redis.call('HGET', KEYS[1], ARGV[i]) == ARGV[i + 1] then
+        redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 2])
+        rewritten[#rewritten + 1] = 1
+    else
+        rewritten[#rewritten + 1] = 0
+    end
+end
+return rewritten
+"""
+
+
+def _history_record(entry: Dict) -> Dict:
+    response = dict(entry['response'])
+    response.pop('context', None)
+    return {**entry, 'response': response}
+
+
+def migrate_history(client: redis.Redis, key: str, dry_run: bool = False) -> Dict[str, int]:
+    """Re-encode a history list's JSON entries, keeping its order and TTL"""
+    with client.pipeline() as pipe:
+        while True:
+            try:
+                # Appends racing the rewrite abort it and it is retried
+                pipe.watch(key)
+                entries = pipe.lrange(key, 0, -1)
+                legacy = sum(is_legacy(e) for e in entries)
+                if not legacy:
+                    return {"records": 0, "bytes_before": 0, "bytes_after": 0}
+                migrated = [
+                    encode_record(_history_record(decode_record(e))) if is_legacy(e) else e
+                    for e in entries
+                ]
+                stats = {
+                    "records": legacy,
+                    "bytes_before": sum(len(e) for e in entries),
+                    "bytes_after": sum(len(e) for e in migrated),
+                }
+                if dry_run:
+                    return stats
+                ttl = pipe.pttl(key)
+                pipe.multi()
+                pipe.delete(key)
+                pipe.rpush(key, *migrated)
+                if ttl > 0:
+                    pipe.pexpire(key, ttl)
+                pipe.execute()
+                return stats
+            except redis.WatchError:
+                continue
+
+
+def migrate_chats(client: redis.Redis, key: str, dry_run: bool = False, batch: int = 100) -> Dict[str, int]:
+    """Re-encode a chats hash's JSON records; HSET leaves the key's TTL alone"""
+    stats = {"records": 0, "bytes_before": 0, "bytes_after": 0}
+    pending = []
+    for chat_id, data in client.hscan_iter(key):
+        if is_legacy(data):
+            pending.append((chat_id, data, encode_record(decode_record(data))))
+    rewrite = client.register_script(REWRITE_FIELDS_SCRIPT)
+    for start in range(0, len(pending), batch):
+        chunk = pending[start:start + batch]
+        if dry_run:
+            rewritten = [1] * len(chunk)
+        else:
+            args = [value for fields in chunk for value in fields]
+            rewritten = rewrite(keys=[key], args=args)
+        for (_, data, record), done in zip(chunk, rewritten):
+            if done:
+                stats["records"] += 1
+                stats["bytes_before"] += len(data)
+                stats["bytes_after"] += len(record)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert JSON conversation history and chat records in Redis to the compact binary format"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Report the savings without writing")
+    parser.add_argument("--batch", type=int, default=500, help="SCAN page size")
+    args = parser.parse_args()
+
+    client = RedisConnection().binary_client
+    totals = {"keys": 0, "records": 0, "bytes_before": 0, "bytes_after": 0}
+    for pattern, migrate in (("session:*:history", migrate_history), ("session:*:chats", migrate_chats)):
+        for key in client.scan_iter(match=pattern, count=args.batch):
+            stats = migrate(client, key, dry_run=args.dry_run)
+            if stats["records"]:
+                totals["keys"] += 1
+                for field in ("records", "bytes_before", "bytes_after"):
+                    totals[field] += stats[field]
+
+    verb = "Would convert" if args.dry_run else "Converted"
+    print(
+        f"{verb} {totals['records']} records in {totals['keys']} keys: "
+        f"{totals['bytes_before']} -> {totals['bytes_after']} bytes"
+    )
+
+
+if __name__ == "__main__":
+    main()
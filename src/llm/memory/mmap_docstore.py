@@ -0,0 +1,135 @@
+import argparse
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping, Union
+import numpy as np
+from langchain_core.documents import Document
+from langchain_community.docstore.base import Docstore
+
+RECORDS_FILE = "docstore.bin"
+OFFSETS_FILE = "docstore.offsets.npy"
+
+
+class PositionalIds(Mapping):
+    """index_to_docstore_id for compact stores: FAISS position i maps to id "i" without a dict"""
+
+    def __init__(self, size: int):
+        self._size = size
+
+    def __getitem__(self, position) -> str:
+        position = int(position)
+        if not 0 <= position < self._size:
+            raise KeyError(position)
+        return str(position)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(self._size))
+
+
+class MmapDocstore(Docstore):
+    """
+    Read-only docstore backed by two files that are memory-mapped rather than
+    unpickled: concatenated JSON records and an int64 offsets array. Every
+    worker process maps the same page-cache pages instead of holding a private
+    copy of the corpus.
+    """
+
+    def __init__(self, directory: Path):
+        directory = Path(directory)
+        self._offsets = np.load(directory / OFFSETS_FILE, mmap_mode="r")
+        self._file = open(directory / RECORDS_FILE, "rb")
+        # mmap cannot map an empty file
+        self._records = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if os.fstat(self._file.fileno()).st_size else b""
+        )
+
+    @staticmethod
+    def exists(directory: Path) -> bool:
+        directory = Path(directory)
+        return (directory / RECORDS_FILE).exists() and (directory / OFFSETS_FILE).exists()
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def search(self, search: str) -> Union[str, Document]:
+        try:
+            position = int(search)
+        except ValueError:
+            return f"ID {search} not found."
+        if not 0 <= position < len(self):
+            return f"ID {search} not found."
+        start, end = int(self._offsets[position]), int(self._offsets[position + 1])
+        record = json.loads(self._records[start:end])
+        return Document(page_content=record["text"], metadata=record["metadata"])
+
+    def close(self) -> None:
+        if isinstance(self._records, mmap.mmap):
+            self._records.close()
+        self._file.close()
+
+    @staticmethod
+    def write(directory: Path, documents: Iterable[Document]) -> int:
+        """Write documents in FAISS position order; files are swapped in atomically"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        records_tmp = directory / (RECORDS_FILE + ".tmp")
+        offsets_tmp = directory / (OFFSETS_FILE + ".tmp")
+
+        offsets = [0]
+        with open(records_tmp, "wb") as f:
+            for doc in documents:
+                f.write(json.dumps(
+                    {"text": doc.page_content, "metadata": doc.metadata},
+                    ensure_ascii=False
+                ).encode("utf-8"))
+                offsets.append(f.tell())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(offsets_tmp, "wb") as f:
+            np.save(f, np.asarray(offsets, dtype=np.int64))
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(offsets_tmp, directory / OFFSETS_FILE)
+        os.replace(records_tmp, directory / RECORDS_FILE)
+        return len(offsets) - 1
+
+
+def export_compact_docstore(vectorstore, directory: Path) -> int:
+    """Write a langchain FAISS store's docstore in the compact mmap format"""
+    def documents() -> Iterator[Document]:
+        for position in range(vectorstore.index.ntotal):
+            doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+            if not isinstance(doc, Document):
+                raise ValueError(f"Missing document for FAISS position {position}")
+            yield doc
+    return MmapDocstore.write(directory, documents())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert a saved FAISS store's pickled docstore to the compact mmap format"
+    )
+    parser.add_argument("db_path", type=Path)
+    args = parser.parse_args()
+
+    from langchain_community.vectorstores import FAISS
+    from src.llm.memory.vector_store import default_embedding_model
+
+    vectorstore = FAISS.load_local(
+        str(args.db_path),
+        default_embedding_model(),
+        allow_dangerous_deserialization=True
+    )
+    count = export_compact_docstore(vectorstore, args.db_path)
+    print(f"Wrote {count} records to {args.db_path / RECORDS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from src.llm.core.config import settings
+from src.llm.utils.logging import TheryBotLogger
+
+MODEL_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+CONFIG_FILE = "embedding_config.json"
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence embeddings from an int8-quantized ONNX export of a
+    sentence-transformers model, run through onnxruntime.
+
+    Tokenization uses the standalone `tokenizers` library and pooling is done
+    in numpy, so neither torch nor sentence-transformers is imported. The
+    export is produced by `python -m src.utils.export_onnx`, which also
+    checks parity against the torch model.
+    """
+
+    def __init__(
+        self,
+        model_dir: str = settings.ONNX_EMBEDDING_PATH,
+        num_threads: Optional[int] = settings.EMBEDDING_NUM_THREADS,
+        logger: Optional[TheryBotLogger] = None
+    ):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise RuntimeError(
+                "EMBEDDING_BACKEND=onnx requires the onnx extra (poetry install -E onnx, "
+                "or pip install -r requirements-onnx.txt)"
+            )
+
+        self.model_dir = Path(model_dir)
+        if not (self.model_dir / MODEL_FILE).exists():
+            raise RuntimeError(
+                f"No ONNX embedding model at {self.model_dir}; run python -m src.utils.export_onnx"
+            )
+        self.logger = logger or TheryBotLogger()
+
+        config = json.loads((self.model_dir / CONFIG_FILE).read_text())
+        # Namespaced apart from the torch model so cached vectors never mix
+        self.model_name = f"{config['model_name']}:onnx-int8"
+        self.max_length = config["max_length"]
+        self.normalize = config.get("normalize", True)
+
+        self.tokenizer = Tokenizer.from_file(str(self.model_dir / TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.max_length)
+        self.tokenizer.enable_padding(pad_id=config.get("pad_token_id", 0))
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            str(self.model_dir / MODEL_FILE),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {node.name for node in self.session.get_inputs()}
+        # The tokenizer keeps padding/truncation state, so encoding is serialised
+        self._tokenizer_lock = threading.Lock()
+
+        self.logger.log_interaction(
+            interaction_type="onnx_embeddings_loaded",
+            data={"model": self.model_name, "path": str(self.model_dir)},
+            level=logging.INFO
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._embed(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0].tolist()
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        feeds = self._tokenize(texts)
+        hidden = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, as sentence-transformers does
+        mask = feeds["attention_mask"][..., None].astype(np.float32)
+        vectors = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors.astype(np.float32)
+
+    def _tokenize(self, texts: List[str]) -> Dict[str, Any]:
+        with self._tokenizer_lock:
+            encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+        }
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        return feeds
@@ -0,0 +1,124 @@
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+from langchain_core.embeddings import Embeddings
+from src.llm.core.config import settings
+from src.llm.utils.logging import TheryBotLogger
+from src.llm.memory.vector_store import FAISSVectorSearch, default_embedding_model, ranked_search
+
+PARTITIONS_FILE = "partitions.json"
+PARTITIONS_DIR = "partitions"
+# Chunk metadata fields whose values are recorded per partition for pruning
+FILTER_FIELDS = ("source", "topic", "language")
+
+
+def partition_name(value: str) -> str:
+    """Directory-safe partition name for a metadata value"""
+    return re.sub(r"[^a-z0-9_-]+", "-", str(value).lower()).strip("-") or "default"
+
+
+def write_partition_manifest(db_path: Path, partition_by: str, partitions: Dict[str, Dict[str, List[str]]]) -> None:
+    db_path = Path(db_path)
+    tmp_path = db_path / (PARTITIONS_FILE + ".tmp")
+    tmp_path.write_text(json.dumps({"partition_by": partition_by, "partitions": partitions}, indent=2))
+    os.replace(tmp_path, db_path / PARTITIONS_FILE)
+
+
+class PartitionedVectorSearch:
+    """
+    Vector search over the per-partition sub-indexes written by partitioned
+    ingestion (`python -m src.utils.ingest --partition-by topic`).
+
+    partitions.json records, for every partition, the values of FILTER_FIELDS
+    its chunks carry. A filtered search only probes partitions that can
+    match, and the rest of the filter is applied to the candidates.
+    """
+
+    def __init__(
+        self,
+        embedding_model: Optional[Embeddings] = None,
+        db_path: Path = Path(settings.VECTOR_DB_PATH),
+        k: int = settings.VECTOR_SEARCH_K,
+        logger: Optional[TheryBotLogger] = None,
+        **store_kwargs
+    ):
+        self.embedding_model = embedding_model or default_embedding_model()
+        self.db_path = Path(db_path)
+        self.k = k
+        self.logger = logger or TheryBotLogger()
+
+        manifest = json.loads((self.db_path / PARTITIONS_FILE).read_text())
+        self.partition_by = manifest["partition_by"]
+        self.partitions: Dict[str, Dict[str, List[str]]] = manifest["partitions"]
+        self.stores = {
+            name: FAISSVectorSearch(
+                embedding_model=self.embedding_model,
+                db_path=self.db_path / PARTITIONS_DIR / name,
+                k=k,
+                logger=self.logger,
+                **store_kwargs
+            )
+            for name in self.partitions
+        }
+
+    @staticmethod
+    def exists(db_path: Path) -> bool:
+        return (Path(db_path) / PARTITIONS_FILE).exists()
+
+    def select(self, filters: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Names of the partitions whose recorded metadata can satisfy `filters`"""
+        if not filters:
+            return list(self.partitions)
+        return [
+            name for name, values in self.partitions.items()
+            if all(self._may_match(values.get(field), expected) for field, expected in filters.items())
+        ]
+
+    @staticmethod
+    def _may_match(values: Optional[List[str]], expected: Any) -> bool:
+        # Fields the manifest does not track are checked per chunk instead
+        if values is None:
+            return True
+        allowed = expected if isinstance(expected, (list, tuple, set)) else [expected]
+        return any(value in values for value in allowed)
+
+    def search_sources(self, filters: Optional[Dict[str, Any]] = None) -> List[Any]:
+        return [source for name in self.select(filters) for source in self.stores[name].search_sources()]
+
+    def search(
+        self,
+        query: str,
+        k: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        try:
+            sources = self.search_sources(filters)
+            if not sources:
+                return []
+            results = ranked_search(sources, query, k or self.k, filters)
+            return [res.page_content for res in results]
+        except Exception as e:
+            self.logger.log_interaction(
+                interaction_type="vector_search_error",
+                data={"error": str(e), "filters": filters},
+                level=logging.ERROR
+            )
+            return []
+
+    def close(self) -> None:
+        for store in self.stores.values():
+            store.close()
+
+
+def load_vector_search(
+    embedding_model: Optional[Embeddings] = None,
+    db_path: Path = Path(settings.VECTOR_DB_PATH),
+    **store_kwargs
+) -> Union[FAISSVectorSearch, PartitionedVectorSearch]:
+    """Open the partitioned store if ingestion wrote one, else the single index"""
+    if PartitionedVectorSearch.exists(db_path):
+        return PartitionedVectorSearch(embedding_model=embedding_model, db_path=db_path, **store_kwargs)
+    return FAISSVectorSearch(embedding_model=embedding_model, db_path=db_path, **store_kwargs)
@@ -0,0 +1,52 @@
+from typing import Any, Dict, Union
+import json
+import msgpack
+from src.llm.core.config import settings
+
+try:
+    import zstandard
+except ImportError:  # compression is optional
+    zstandard = None
+
+# Binary records start with a version byte and a flags byte; legacy JSON
+# records always start with "{", which can never be a valid version
+FORMAT_VERSION = 1
+FLAG_ZSTD = 0x01
+_HEADER_SIZE = 2
+
+_compressor = zstandard.ZstdCompressor(level=3) if zstandard else None
+_decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+
+def encode_record(
+    record: Dict[str, Any],
+    compression: str = settings.REDIS_RECORD_COMPRESSION,
+    min_compress_bytes: int = settings.REDIS_RECORD_COMPRESS_MIN_BYTES
+) -> bytes:
+    """msgpack a record, zstd-compressing payloads large enough to benefit"""
+    payload = msgpack.packb(record, use_bin_type=True)
+    flags = 0
+    if compression == "zstd" and _compressor is not None and len(payload) >= min_compress_bytes:
+        compressed = _compressor.compress(payload)
+        if len(compressed) < len(payload):
+            payload, flags = compressed, flags | FLAG_ZSTD
+    return bytes((FORMAT_VERSION, flags)) + payload
+
+
+def is_legacy(data: Union[bytes, str]) -> bool:
+    return isinstance(data, str) or data[:1] == b"{"
+
+
+def decode_record(data: Union[bytes, str]) -> Dict[str, Any]:
+    """Decode a binary record, or a legacy JSON record written before this format"""
+    if is_legacy(data):
+        return json.loads(data)
+    version, flags = data[0], data[1]
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported record format version {version}")
+    payload = data[_HEADER_SIZE:]
+    if flags & FLAG_ZSTD:
+        if _decompressor is None:
+            raise RuntimeError("Record is zstd-compressed but zstandard is not installed")
+        payload = _decompressor.decompress(payload)
+    return msgpack.unpackb(payload, raw=False)
@@ -1,25 +1,74 @@
 import redis
+import redis.asyncio as aioredis
 import logging
+from typing import Any, Dict
+from redis.backoff import ExponentialBackoff
+from redis.retry import Retry
+from redis.asyncio.retry import Retry as AsyncRetry
 from src.llm.core.config import settings
 from src.llm.utils.logging import TheryBotLogger
 
+def _pool_options() -> Dict[str, Any]:
+    """Connection settings shared by every pool"""
+    return {
+        "max_connections": settings.REDIS_MAX_CONNECTIONS,
+        "socket_timeout": settings.REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        "socket_keepalive": settings.REDIS_SOCKET_KEEPALIVE,
+        # Stale connections are re-checked by the pool, not on every access
+        "health_check_interval": settings.REDIS_HEALTH_CHECK_INTERVAL,
+        "retry_on_error": [redis.ConnectionError, redis.TimeoutError],
+    }
+
+def _backoff() -> ExponentialBackoff:
+    return ExponentialBackoff(cap=settings.REDIS_RETRY_BACKOFF_CAP, base=settings.REDIS_RETRY_BACKOFF_BASE)
+
 class RedisConnection:
     _instance = None
 
     def __new__(cls):
         if not cls._instance:
-            cls._instance = super().__new__(cls)
-            cls._instance._initialize_self()
+            instance = super().__new__(cls)
+            instance._initialize_self()
+            # Only a connected instance is shared, so a failed connect is retried
+            cls._instance = instance
         return cls._instance
 
     def _initialize_self(self) -> None:
         self.logger = TheryBotLogger()
+        url = settings.effective_redis_url
         try:
-            self.redis = redis.from_url(
-                settings.effective_redis_url,
-                decode_responses=True
+            self.pool = redis.ConnectionPool.from_url(
+                url,
+                decode_responses=True,
+                retry=Retry(_backoff(), settings.REDIS_RETRY_ATTEMPTS),
+                **_pool_options()
             )
+            self.redis = redis.Redis(connection_pool=self.pool)
+            # Fail fast at startup; afterwards the pool health-checks connections
             self.redis.ping()
+            # Raw bytes (e.g. float32 vectors) need a client that skips decoding
+            self.binary_pool = redis.ConnectionPool.from_url(
+                url,
+                retry=Retry(_backoff(), settings.REDIS_RETRY_ATTEMPTS),
+                **_pool_options()
+            )
+            self.binary_redis = redis.Redis(connection_pool=self.binary_pool)
+            # One async pool for every memory class; connections are opened
+            # lazily on the running event loop
+            self.async_pool = aioredis.ConnectionPool.from_url(
+                url,
+                decode_responses=True,
+                retry=AsyncRetry(_backoff(), settings.REDIS_RETRY_ATTEMPTS),
+                **_pool_options()
+            )
+            self.async_redis = aioredis.Redis(connection_pool=self.async_pool)
+            self.async_binary_pool = aioredis.ConnectionPool.from_url(
+                url,
+                retry=AsyncRetry(_backoff(), settings.REDIS_RETRY_ATTEMPTS),
+                **_pool_options()
+            )
+            self.async_binary_redis = aioredis.Redis(connection_pool=self.async_binary_pool)
         except redis.ConnectionError as e:
             self.logger.log_interaction(
                 interaction_type="redis_connection_failed",
@@ -30,8 +79,49 @@ class RedisConnection:
 
     @property
     def client(self) -> redis.Redis:
-        try:
-            self.redis.ping()
-        except Exception:
-            self._initialize_self()
-        return self.redis
\ No newline at end of file
+        return self.redis
+
+    @property
+    def binary_client(self) -> redis.Redis:
+        return self.binary_redis
+
+    @property
+    def async_client(self) -> aioredis.Redis:
+        return self.async_redis
+
+    @property
+    def async_binary_client(self) -> aioredis.Redis:
+        return self.async_binary_redis
+
+    def pool_stats(self) -> Dict[str, Dict[str, int]]:
+        """Connection counts per pool, for utilisation metrics"""
+        stats = {}
+        pools = (
+            ("sync", self.pool),
+            ("binary", self.binary_pool),
+            ("async", self.async_pool),
+            ("async_binary", self.async_binary_pool),
+        )
+        for name, pool in pools:
+            in_use = len(getattr(pool, "_in_use_connections", ()))
+            idle = len(getattr(pool, "_available_connections", ()))
+            stats[name] = {
+                "max_connections": pool.max_connections,
+                "in_use": in_use,
+                "idle": idle,
+                "utilisation": round(in_use / pool.max_connections, 3) if pool.max_connections else 0.0,
+            }
+        return stats
+
+    def close(self) -> None:
+        """Release pooled sync connections"""
+        self.pool.disconnect()
+        self.binary_pool.disconnect()
+
+    async def aclose(self) -> None:
+        """Release pooled async connections"""
+        await self.async_redis.aclose()
+        await self.async_binary_redis.aclose()
+        # A client does not close a pool it was handed
+        await self.async_pool.disconnect()
+        await self.async_binary_pool.disconnect()
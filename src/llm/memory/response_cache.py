@@ -0,0 +1,137 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Optional
+from .redis_connection import RedisConnection
+from src.llm.core.config import settings
+from src.llm.utils.logging import TheryBotLogger
+
+class LLMResponseCache:
+    """
+    Redis-backed cache of LLM completions keyed on (model, temperature, prompt).
+
+    Entries live under `llm_cache:{sha256}` with a per-call-site TTL. A sorted
+    set indexed by expiry time bounds the number of live entries.
+    """
+    KEY_PREFIX = "llm_cache"
+    INDEX_KEY = "llm_cache:index"
+
+    def __init__(
+        self,
+        max_entries: int = settings.LLM_CACHE_MAX_ENTRIES,
+        max_entry_bytes: int = settings.LLM_CACHE_MAX_ENTRY_BYTES,
+        logger: Optional[TheryBotLogger] = None
+    ):
+        connection = RedisConnection()
+        self.redis = connection.client
+        self.async_redis = connection.async_client
+        self.max_entries = max_entries
+        self.max_entry_bytes = max_entry_bytes
+        self.logger = logger or TheryBotLogger()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0, "skipped": 0})
+
+    @staticmethod
+    def ttl_for(site: Optional[str]) -> int:
+        """TTL in seconds for a call site; 0 means caching is disabled there"""
+        if not settings.LLM_CACHE_ENABLED or not site:
+            return 0
+        return int(settings.LLM_CACHE_TTLS.get(site, 0))
+
+    def make_key(self, model_name: str, temperature: float, prompt: str) -> str:
+        digest = hashlib.sha256(
+            json.dumps([model_name, temperature, prompt]).encode("utf-8")
+        ).hexdigest()
+        return f"{self.KEY_PREFIX}:{digest}"
+
+    def get(self, key: str, site: str) -> Optional[str]:
+        try:
+            value = self.redis.get(key)
+        except Exception as e:
+            self._log_error("get", e)
+            value = None
+        self._count(site, "hits" if value is not None else "misses")
+        return value
+
+    async def get_async(self, key: str, site: str) -> Optional[str]:
+        try:
+            value = await self.async_redis.get(key)
+        except Exception as e:
+            self._log_error("get", e)
+            value = None
+        self._count(site, "hits" if value is not None else "misses")
+        return value
+
+    def set(self, key: str, content: str, ttl: int, site: str) -> None:
+        if not self._storable(content, site):
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            self._queue_set(pipe, key, content, ttl)
+            entries = pipe.execute()[-1]
+            self._evict(entries)
+        except Exception as e:
+            self._log_error("set", e)
+
+    async def set_async(self, key: str, content: str, ttl: int, site: str) -> None:
+        if not self._storable(content, site):
+            return
+        try:
+            pipe = self.async_redis.pipeline(transaction=False)
+            self._queue_set(pipe, key, content, ttl)
+            entries = (await pipe.execute())[-1]
+            await self._evict_async(entries)
+        except Exception as e:
+            self._log_error("set", e)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per call site for this process"""
+        with self._lock:
+            sites = {site: dict(counts) for site, counts in self._counters.items()}
+        for counts in sites.values():
+            lookups = counts["hits"] + counts["misses"]
+            counts["hit_rate"] = counts["hits"] / lookups if lookups else 0.0
+        return sites
+
+    def _storable(self, content: str, site: str) -> bool:
+        if len(content.encode("utf-8")) > self.max_entry_bytes:
+            self._count(site, "skipped")
+            return False
+        return True
+
+    def _queue_set(self, pipe: Any, key: str, content: str, ttl: int) -> None:
+        now = time.time()
+        pipe.set(key, content, ex=ttl)
+        pipe.zadd(self.INDEX_KEY, {key: now + ttl})
+        # Expired keys are already gone; drop them from the index
+        pipe.zremrangebyscore(self.INDEX_KEY, "-inf", now)
+        pipe.zcard(self.INDEX_KEY)
+
+    def _evict(self, entries: int) -> None:
+        overflow = entries - self.max_entries
+        if overflow > 0:
+            # Evict the entries closest to expiry
+            evicted = [key for key, _ in self.redis.zpopmin(self.INDEX_KEY, overflow)]
+            if evicted:
+                self.redis.delete(*evicted)
+
+    async def _evict_async(self, entries: int) -> None:
+        overflow = entries - self.max_entries
+        if overflow > 0:
+            evicted = [key for key, _ in await self.async_redis.zpopmin(self.INDEX_KEY, overflow)]
+            if evicted:
+                await self.async_redis.delete(*evicted)
+
+    def _count(self, site: str, counter: str) -> None:
+        with self._lock:
+            self._counters[site][counter] += 1
+
+    def _log_error(self, operation: str, error: Exception) -> None:
+        self.logger.log_interaction(
+            interaction_type="llm_cache_error",
+            data={"operation": operation, "error": str(error)},
+            level=logging.WARNING
+        )
@@ -1,13 +1,34 @@
 import time
 import uuid
-from typing import Optional, Tuple
+from typing import Any, Optional, Tuple
 from .redis_connection import RedisConnection
 from src.llm.core.config import settings
 
+# Keys a session owns besides its `session:{id}` hash, as session:{id}:<suffix>
+SESSION_KEY_SUFFIXES = ("chats", "state", "history", "context", "summary")
+
+# Validate a session, touch its activity, slide its TTL and return its
+# user_id in one round trip. Only declared keys are touched, so the script
+# stays valid on Redis Cluster; the user's session set is refreshed by the
+# pipelines that create sessions and store turns instead
+VALIDATE_SESSION_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HSET', KEYS[1], 'activity', ARGV[1])
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    return redis.call('HGET', KEYS[1], 'user_id')
+end
+return false
+"""
+
 class SessionManager:
     def __init__(self):
-        self.redis = RedisConnection().client
-        
+        connection = RedisConnection()
+        self.redis = connection.client
+        self.async_redis = connection.async_client
+        # Scripts run via EVALSHA and reload themselves on NOSCRIPT
+        self._validate_session = self.redis.register_script(VALIDATE_SESSION_SCRIPT)
+        self._validate_session_async = self.async_redis.register_script(VALIDATE_SESSION_SCRIPT)
+
     def generate_ids(self, existing_user_id: Optional[str] = None) -> Tuple[str, str]:
         """
         Generate or validate user/session IDs
@@ -17,6 +38,12 @@ class SessionManager:
         session_id = self._create_session(user_id)
         return user_id, session_id
 
+    async def generate_ids_async(self, existing_user_id: Optional[str] = None) -> Tuple[str, str]:
+        """Async version of generate_ids"""
+        user_id = await self._get_or_create_user_id_async(existing_user_id)
+        session_id = await self._create_session_async(user_id)
+        return user_id, session_id
+
     def _get_or_create_user_id(self, existing_user_id: Optional[str]) -> str:
         if existing_user_id:
             if self.redis.exists(f"user:{existing_user_id}"):
@@ -25,24 +52,44 @@ class SessionManager:
             return str(uuid.uuid4())
         return str(uuid.uuid4())
 
+    async def _get_or_create_user_id_async(self, existing_user_id: Optional[str]) -> str:
+        if existing_user_id and await self.async_redis.exists(f"user:{existing_user_id}"):
+            return existing_user_id
+        return str(uuid.uuid4())
+
     def _create_session(self, user_id: str) -> str:
         session_id = str(uuid.uuid4())
+        self._queue_session(self.redis.pipeline(), session_id, user_id).execute()
+        return session_id
+
+    async def _create_session_async(self, user_id: str) -> str:
+        session_id = str(uuid.uuid4())
+        await self._queue_session(self.async_redis.pipeline(), session_id, user_id).execute()
+        return session_id
+
+    def _queue_session(self, pipe: Any, session_id: str, user_id: str) -> Any:
+        """Queue session creation on a MULTI/EXEC pipeline: one atomic round trip"""
         # Store session metadata
-        self.redis.hset(f"session:{session_id}", mapping={
-            "user_id": user_id,
-            "created_at": str(time.time()),
-            "activity": str(time.time())
-        })
+        pipe.hset(f"session:{session_id}", mapping=self._session_metadata(user_id))
         # Set TTL (24 hours by default)
-        self.redis.expire(f"session:{session_id}", settings.SESSION_TTL)
-        # Link to user
-        self.redis.sadd(f"user:{user_id}:sessions", session_id)
-        return session_id
+        pipe.expire(f"session:{session_id}", settings.SESSION_TTL)
+        # Link to user; ids of expired sessions are removed by SessionSweeper
+        pipe.sadd(f"user:{user_id}:sessions", session_id)
+        pipe.expire(f"user:{user_id}:sessions", settings.SESSION_TTL)
+        return pipe
+
+    def _session_metadata(self, user_id: str) -> dict:
+        now = str(time.time())
+        return {
+            "user_id": user_id,
+            "created_at": now,
+            "activity": now
+        }
 
     def validate_session(self, session_id: str) -> Optional[str]:
-        """Returns user_id if valid session"""
-        if self.redis.exists(f"session:{session_id}"):
-            # Update last activity
-            self.redis.hset(f"session:{session_id}", "activity", str(time.time()))
-            return self.redis.hget(f"session:{session_id}", "user_id")
-        return None
\ No newline at end of file
+        """Returns user_id if valid session, updating its last activity"""
+        return self._validate_session(keys=[f"session:{session_id}"], args=[str(time.time()), settings.SESSION_TTL])
+
+    async def validate_session_async(self, session_id: str) -> Optional[str]:
+        """Async version of validate_session"""
+        return await self._validate_session_async(keys=[f"session:{session_id}"], args=[str(time.time()), settings.SESSION_TTL])
@@ -0,0 +1,203 @@
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+from .redis_connection import RedisConnection
+from .session_manager import SESSION_KEY_SUFFIXES
+from src.llm.core.config import settings
+from src.llm.utils.logging import TheryBotLogger
+
+SWEEP_LOCK_KEY = "session_sweeper:lock"
+LEADER_KEY = "session_sweeper:leader"
+
+# Extend or release the leader lease only if this sweeper still holds it
+RENEW_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class SessionSweeper:
+    """
+    Reclaims session data Redis does not expire on its own: ids left in
+    user:{id}:sessions after their session hash expired, and per-session keys
+    (chats, state, history, ...) whose session is gone. Session keys written
+    before every key carried a TTL are given SESSION_TTL.
+
+    Keys are visited with SCAN in small batches with a pause between them,
+    so a sweep never blocks Redis for long. `start` may be called in every
+    worker, but only the one holding the leader lease (a Redis key renewed
+    every lease/3 seconds) sweeps; the others only retry the lease, and take
+    over when the leader stops or dies. A lock held for the interval keeps a
+    new leader from repeating a sweep its predecessor just ran.
+    """
+
+    def __init__(
+        self,
+        interval: int = settings.SESSION_SWEEP_INTERVAL,
+        batch: int = settings.SESSION_SWEEP_BATCH,
+        pause: float = settings.SESSION_SWEEP_PAUSE,
+        lease: int = settings.SESSION_SWEEP_LEASE,
+        logger: Optional[TheryBotLogger] = None
+    ):
+        self.redis = RedisConnection().client
+        self._renew_lease = self.redis.register_script(RENEW_LEASE_SCRIPT)
+        self._release_lease = self.redis.register_script(RELEASE_LEASE_SCRIPT)
+        self.interval = interval
+        self.batch = batch
+        self.pause = pause
+        self.lease = lease
+        self._token = uuid.uuid4().hex
+        self._leader = False
+        self.logger = logger or TheryBotLogger()
+        self._counters = {
+            "sweeps": 0,
+            "keys_scanned": 0,
+            "session_ids_removed": 0,
+            "orphaned_keys_removed": 0,
+            "ttls_restored": 0,
+        }
+        self._last_sweep: Dict[str, Any] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="session-sweeper", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            if self._leader:
+                # Let another worker take over without waiting out the lease
+                try:
+                    self._release_lease(keys=[LEADER_KEY], args=[self._token])
+                except Exception:
+                    pass
+                self._leader = False
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self._hold_lease() and self.redis.set(SWEEP_LOCK_KEY, 1, nx=True, ex=self.interval):
+                    self.sweep()
+            except Exception as e:
+                self.logger.log_interaction(
+                    interaction_type="session_sweep_error",
+                    data={"error": str(e)},
+                    level=logging.ERROR
+                )
+            self._stop.wait(max(self.lease // 3, 1))
+
+    def _hold_lease(self) -> bool:
+        """Renew the leader lease, or take it if it is free"""
+        was_leader = self._leader
+        if self._leader:
+            self._leader = bool(self._renew_lease(keys=[LEADER_KEY], args=[self._token, self.lease]))
+        if not self._leader:
+            self._leader = bool(self.redis.set(LEADER_KEY, self._token, nx=True, ex=self.lease))
+        if self._leader != was_leader:
+            self.logger.log_interaction(
+                interaction_type="session_sweeper_leader" if self._leader else "session_sweeper_standby",
+                data={"token": self._token},
+                level=logging.INFO
+            )
+        return self._leader
+
+    def sweep(self) -> Dict[str, Any]:
+        """One full pass over user session sets and per-session keys"""
+        started = time.perf_counter()
+        result = {"keys_scanned": 0, "session_ids_removed": 0, "orphaned_keys_removed": 0, "ttls_restored": 0}
+        self._sweep_user_sessions(result)
+        self._sweep_session_keys(result)
+
+        for name, value in result.items():
+            self._counters[name] += value
+        self._counters["sweeps"] += 1
+        self._last_sweep = {
+            **result,
+            "finished_at": time.time(),
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        self.logger.log_interaction(
+            interaction_type="session_sweep",
+            data=self._last_sweep,
+            level=logging.INFO
+        )
+        return self._last_sweep
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._counters, "leader": self._leader, "last_sweep": self._last_sweep}
+
+    def _sweep_user_sessions(self, result: Dict[str, int]) -> None:
+        for keys in self._scan_batches("user:*:sessions"):
+            result["keys_scanned"] += len(keys)
+            for key in keys:
+                session_ids = list(self.redis.sscan_iter(key, count=self.batch))
+                expired = self._missing_sessions(session_ids)
+                if expired:
+                    # An emptied set is deleted by Redis
+                    result["session_ids_removed"] += self.redis.srem(key, *expired)
+            result["ttls_restored"] += self._restore_ttls(keys)
+
+    def _sweep_session_keys(self, result: Dict[str, int]) -> None:
+        for keys in self._scan_batches("session:*"):
+            result["keys_scanned"] += len(keys)
+            owners = {}
+            for key in keys:
+                session_id, _, suffix = key[len("session:"):].partition(":")
+                # The session hash itself, or a key it owns; locks carry their own expiry
+                if not suffix or suffix in SESSION_KEY_SUFFIXES:
+                    owners[key] = session_id
+            gone = set(self._missing_sessions(list(set(owners.values()))))
+            orphaned = [key for key, session_id in owners.items() if session_id in gone]
+            if orphaned:
+                result["orphaned_keys_removed"] += self.redis.unlink(*orphaned)
+            live = [key for key, session_id in owners.items() if session_id not in gone]
+            result["ttls_restored"] += self._restore_ttls(live)
+
+    def _restore_ttls(self, keys: List[str]) -> int:
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.ttl(key)
+        # -1: the key exists but never expires
+        persistent = [key for key, ttl in zip(keys, pipe.execute()) if ttl == -1]
+        for key in persistent:
+            pipe.expire(key, settings.SESSION_TTL)
+        pipe.execute()
+        return len(persistent)
+
+    def _missing_sessions(self, session_ids: List[str]) -> List[str]:
+        """The ids whose `session:{id}` hash no longer exists"""
+        missing = []
+        for start in range(0, len(session_ids), self.batch):
+            chunk = session_ids[start:start + self.batch]
+            pipe = self.redis.pipeline(transaction=False)
+            for session_id in chunk:
+                pipe.exists(f"session:{session_id}")
+            missing.extend(session_id for session_id, exists in zip(chunk, pipe.execute()) if not exists)
+        return missing
+
+    def _scan_batches(self, pattern: str) -> Iterator[List[str]]:
+        cursor = 0
+        while True:
+            cursor, keys = self.redis.scan(cursor, match=pattern, count=self.batch)
+            if keys:
+                yield keys
+            if cursor == 0 or self._stop.is_set():
+                return
+            # Let other clients in between batches
+            time.sleep(self.pause)
@@ -1,33 +1,154 @@
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, Hashable, List, Optional, Tuple
 import logging
-from langchain_huggingface import HuggingFaceEmbeddings
+import threading
+import uuid
+from contextlib import nullcontext
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from src.llm.core.config import settings
 from src.llm.utils.logging import TheryBotLogger
+from src.llm.memory.mmap_docstore import MmapDocstore, PositionalIds, export_compact_docstore
+from src.llm.memory.index_spec import IndexSpec
+from src.llm.memory.bm25_index import BM25Index
+from src.llm.memory.delta_store import DELTA_DIR, DeltaLog, DeltaStore
+
+def default_embedding_model(backend: str = settings.EMBEDDING_BACKEND) -> Embeddings:
+    # Imported lazily so the onnx backend never pays for importing torch
+    if backend == "onnx":
+        from src.llm.memory.onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings()
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(
+        model_name="sentence-transformers/all-MiniLM-L6-v2",
+        model_kwargs={"device": "cpu"},
+        encode_kwargs={"normalize_embeddings": True}
+    )
+
+def _is_mapped(path: str) -> Optional[bool]:
+    """Whether `path` is memory-mapped into this process; None where /proc is unavailable"""
+    target = str(Path(path).resolve())
+    try:
+        with open("/proc/self/maps") as maps:
+            return any(line.rstrip("\n").endswith(target) for line in maps)
+    except OSError:
+        return None
+
+# Extra candidates fetched per requested result when metadata filters are applied afterwards
+FILTER_FETCH_FACTOR = 4
+
+def reciprocal_rank_fusion(rankings: List[List[Hashable]], k: int = settings.HYBRID_RRF_K) -> List[Hashable]:
+    """Merge ranked lists; each list contributes 1 / (k + rank) per item"""
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, position in enumerate(ranking, start=1):
+            scores[position] = scores.get(position, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+def matches_filters(metadata: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    """Every filter field must equal the given value, or be one of a list of values"""
+    for field, expected in filters.items():
+        allowed = expected if isinstance(expected, (list, tuple, set)) else [expected]
+        if metadata.get(field) not in allowed:
+            return False
+    return True
+
+def ranked_search(
+    stores: List[Any],
+    query: str,
+    k: int,
+    filters: Optional[Dict[str, Any]] = None
+) -> List[Document]:
+    """
+    Search several stores that share one embedding model as a single corpus;
+    the first must be a FAISSVectorSearch, the rest may be its DeltaStores.
+    The query is embedded once; dense hits are merged by distance and, for
+    stores with a BM25 index, keyword hits by score, then fused with RRF.
+    """
+    hybrid = any(store.bm25 is not None for store in stores)
+    candidates = max(k, settings.HYBRID_CANDIDATES) if hybrid else k
+    if filters:
+        candidates *= FILTER_FETCH_FACTOR
+    vector = np.asarray([stores[0].embedding_model.embed_query(query)], dtype=np.float32)
+
+    dense: List[Tuple[Tuple[int, int], float]] = []
+    keyword: List[Tuple[Tuple[int, int], float]] = []
+    for i, store in enumerate(stores):
+        dense.extend(((i, position), distance) for position, distance in store.dense_candidates(vector, candidates))
+        if store.bm25 is not None:
+            keyword.extend(((i, position), score) for position, score in store.bm25.search(query, candidates))
+    dense.sort(key=lambda hit: hit[1])
+    keyword.sort(key=lambda hit: hit[1], reverse=True)
+
+    ordered = [key for key, _ in dense[:candidates]]
+    if hybrid:
+        ordered = reciprocal_rank_fusion([ordered, [key for key, _ in keyword[:candidates]]])
+
+    results: List[Document] = []
+    for i, position in ordered:
+        doc = stores[i].document_at(position)
+        if doc is None or (filters and not matches_filters(doc.metadata, filters)):
+            continue
+        results.append(doc)
+        if len(results) == k:
+            break
+    return results
 
 class FAISSVectorSearch:
     def __init__(
         self,
-        embedding_model: Optional[HuggingFaceEmbeddings] = None,
-        db_path: Path = Path("vector_embedding/mental_health_vector_db"),
-        k: int = 5,
-        logger: Optional[TheryBotLogger] = None
+        embedding_model: Optional[Embeddings] = None,
+        db_path: Path = Path(settings.VECTOR_DB_PATH),
+        k: int = settings.VECTOR_SEARCH_K,
+        logger: Optional[TheryBotLogger] = None,
+        use_mmap: bool = settings.VECTOR_INDEX_MMAP,
+        retrieval_mode: str = settings.RETRIEVAL_MODE,
+        write_buffered: bool = settings.VECTOR_WRITE_BUFFERED
     ):
         self.embedding_model = embedding_model or self._get_default_embedding_model()
         self.db_path = db_path
         self.k = k
+        self.use_mmap = use_mmap
+        self.read_only = False
+        self.retrieval_mode = retrieval_mode
+        self.bm25: Optional[BM25Index] = None
         self.logger = logger or TheryBotLogger()
+        self.write_buffered = write_buffered
+        # Chunks in the shared delta log (from every worker) not yet compacted
+        # into the base, and this process's additions not yet flushed to it
+        self.delta: Optional[DeltaStore] = None
+        self.pending: Optional[DeltaStore] = None
+        self._log = DeltaLog(self.db_path / DELTA_DIR) if write_buffered else None
+        # The log segments and compaction generation self.delta reflects
+        self._segments: set = set()
+        self._generation = 0
+        self._manifest_stamp = None
+        self._delta_lock = threading.Lock()
+        # Serialises flushes, syncs and compactions within this process; the
+        # log's flock does the same across processes
+        self._write_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
         self._initialize_store()
     
-    def _get_default_embedding_model(self) -> HuggingFaceEmbeddings:
-        return HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={"device": "cpu"},
-            encode_kwargs={"normalize_embeddings": True}
-        )
+    def _get_default_embedding_model(self) -> Embeddings:
+        return default_embedding_model()
     
     def _initialize_store(self) -> None:
-        if self.db_path.exists():
+        # Under the log lock, so another worker's compaction cannot replace
+        # the base between loading it and replaying the log
+        with self._log.locked() if self._log and self.db_path.exists() else nullcontext():
+            self._load_store()
+
+    def _load_store(self) -> None:
+        if self.db_path.exists() and self.use_mmap and MmapDocstore.exists(self.db_path):
+            self.vectorstore = self._load_mmap_store()
+        elif self.db_path.exists():
             self.vectorstore = FAISS.load_local(
                 str(self.db_path),
                 self.embedding_model,
@@ -38,13 +159,105 @@ class FAISSVectorSearch:
             self.vectorstore = FAISS.from_texts(
                 [""], self.embedding_model
             )
+
+        self.index_spec = IndexSpec.load(self.db_path)
+        self.index_spec.apply_search_params(
+            self.vectorstore.index,
+            nprobe=settings.VECTOR_NPROBE,
+            ef_search=settings.VECTOR_EF_SEARCH
+        )
+        if self.retrieval_mode == "hybrid":
+            self.bm25 = self._load_bm25()
+        if self.write_buffered and not self.read_only:
+            self._load_deltas()
+
+    def _load_deltas(self) -> None:
+        """Replay flushed segments that have not been compacted into the base yet"""
+        self.pending = DeltaStore(self.vectorstore.index.d)
+        self.delta = self._replay_log(self.vectorstore)
+
+    def _replay_log(self, base: FAISS) -> DeltaStore:
+        """A delta of every segment in the log; the caller holds the log lock"""
+        manifest = self._log.manifest()
+        delta = DeltaStore(base.index.d)
+        # A crash between saving a compacted base and truncating the log leaves
+        # segments whose chunks are already in the base
+        base_ids = set(base.index_to_docstore_id.values())
+        for ids, docs, vectors in self._log.read(manifest["segments"]):
+            keep = [i for i, chunk_id in enumerate(ids) if chunk_id not in base_ids]
+            delta.add([ids[i] for i in keep], [docs[i] for i in keep], vectors[keep])
+        self._segments = set(manifest["segments"])
+        self._generation = manifest["generation"]
+        self._manifest_stamp = self._log.stamp()
+        return delta
+
+    def _load_bm25(self) -> Optional[BM25Index]:
+        """The keyword index, or None (dense-only search) if it is missing or stale"""
+        if not BM25Index.exists(self.db_path):
+            reason = "missing"
+        else:
+            bm25 = BM25Index.load(self.db_path, mmap=self.use_mmap)
+            if len(bm25) == self.vectorstore.index.ntotal:
+                return bm25
+            reason = "stale"
+        self.logger.log_interaction(
+            interaction_type="bm25_index_unavailable",
+            data={"path": str(self.db_path), "reason": reason},
+            level=logging.WARNING
+        )
+        return None
     
-    def search(self, query: str, k: Optional[int] = None) -> List[str]:
+    def _load_mmap_store(self) -> FAISS:
+        """
+        Map the index and compact docstore read-only so that every worker
+        process shares one physical copy of their pages
+        """
+        import faiss
+
+        index_file = str(self.db_path / "index.faiss")
+        # IO_FLAG_MMAP only maps inverted lists; flat-code indexes (flat, pq,
+        # and the storage under hnsw) need IO_FLAG_MMAP_IFC, or faiss quietly
+        # reads a private copy instead
+        if IndexSpec.load(self.db_path).index_type in ("ivf", "ivfpq"):
+            mmap_flag = faiss.IO_FLAG_MMAP
+        else:
+            mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
         try:
-            results = self.vectorstore.similarity_search(
-                query,
-                k=(k or self.k)
+            index = faiss.read_index(index_file, mmap_flag | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError as e:
+            # Not every index type supports mmap; fall back to a private copy
+            self.logger.log_interaction(
+                interaction_type="vector_index_mmap_unsupported",
+                data={"error": str(e)},
+                level=logging.WARNING
             )
+            index = faiss.read_index(index_file)
+        else:
+            if _is_mapped(index_file) is False:
+                self.logger.log_interaction(
+                    interaction_type="vector_index_not_mapped",
+                    data={"index_file": index_file, "faiss_version": getattr(faiss, "__version__", None)},
+                    level=logging.WARNING
+                )
+
+        docstore = MmapDocstore(self.db_path)
+        self.read_only = True
+        return FAISS(
+            embedding_function=self.embedding_model,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=PositionalIds(index.ntotal)
+        )
+
+    def search(
+        self,
+        query: str,
+        k: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        """Top-k chunk texts, optionally restricted to chunks whose metadata matches `filters`"""
+        try:
+            results = ranked_search(self.search_sources(), query, k or self.k, filters)
             return [res.page_content for res in results]
         except Exception as e:
             # Log error and return empty results
@@ -55,13 +268,207 @@ class FAISSVectorSearch:
             )
             return []
     
-    def add_texts(self, texts: List[str]) -> None:
-        """Add new texts to the vector store"""
-        self.vectorstore.add_texts(texts)
-        # Optionally save after adding
-        self.save()
+    def search_sources(self) -> List[Any]:
+        """The base store plus its uncompacted and unflushed additions"""
+        if self.delta is None:
+            return [self]
+        # Keeps this process following other workers' additions and compactions
+        self._start_flusher()
+        with self._delta_lock:
+            stores = [self.delta, self.pending]
+        return [self] + [store for store in stores if len(store)]
+
+    def dense_candidates(self, vector: np.ndarray, n: int) -> List[Tuple[int, float]]:
+        """(position, L2 distance) pairs for one query vector, nearest first"""
+        distances, positions = self.vectorstore.index.search(vector, n)
+        return [
+            (int(position), float(distance))
+            for position, distance in zip(positions[0], distances[0]) if position >= 0
+        ]
+
+    def document_at(self, position: int) -> Optional[Document]:
+        doc = self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[position])
+        return doc if isinstance(doc, Document) else None
+
+    def add_texts(self, texts: List[str], metadatas: Optional[List[dict]] = None) -> List[str]:
+        """
+        Add new texts to the vector store. When write-buffered they are only
+        embedded and appended to the in-memory delta, which is searchable at
+        once; the background flusher persists and compacts it.
+        """
+        if self.read_only:
+            raise RuntimeError("Vector store was loaded memory-mapped and is read-only")
+        if not self.write_buffered:
+            ids = self.vectorstore.add_texts(texts, metadatas=metadatas)
+            self.save()
+            return ids
+
+        vectors = np.asarray(self.embedding_model.embed_documents(texts), dtype=np.float32)
+        ids = [str(uuid.uuid4()) for _ in texts]
+        docs = [
+            Document(page_content=text, metadata=metadata)
+            for text, metadata in zip(texts, metadatas or [{} for _ in texts])
+        ]
+        with self._delta_lock:
+            self.pending.add(ids, docs, vectors)
+            pending = len(self.pending)
+        self._start_flusher()
+        if pending >= settings.VECTOR_DELTA_FLUSH_SIZE:
+            self._wake.set()
+        return ids
+
+    def _start_flusher(self) -> None:
+        # Started on first use rather than at load, so preloading before fork starts no threads
+        if self._flusher is None:
+            with self._write_lock:
+                if self._flusher is None:
+                    self._flusher = threading.Thread(
+                        target=self._flush_loop, name="vector-delta-flusher", daemon=True
+                    )
+                    self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(settings.VECTOR_DELTA_FLUSH_INTERVAL)
+            self._wake.clear()
+            try:
+                self.sync()
+                self.flush()
+                if len(self.delta) >= settings.VECTOR_DELTA_COMPACT_SIZE:
+                    self.compact()
+            except Exception as e:
+                self.logger.log_interaction(
+                    interaction_type="vector_delta_flush_error",
+                    data={"error": str(e)},
+                    level=logging.ERROR
+                )
+
+    def sync(self) -> None:
+        """
+        Pick up segments flushed by other workers, and reload the base index
+        if another worker has compacted it since this process last looked
+        """
+        if self._log.stamp() == self._manifest_stamp:
+            return
+        with self._write_lock, self._log.locked():
+            self._sync_locked()
+
+    def _sync_locked(self) -> None:
+        manifest = self._log.manifest()
+        if manifest["generation"] != self._generation:
+            base = FAISS.load_local(str(self.db_path), self.embedding_model, allow_dangerous_deserialization=True)
+            self.index_spec.apply_search_params(
+                base.index,
+                nprobe=settings.VECTOR_NPROBE,
+                ef_search=settings.VECTOR_EF_SEARCH
+            )
+            delta = self._replay_log(base)
+            with self._delta_lock:
+                self.bm25 = None
+                self.vectorstore, self.delta = base, delta
+            if self.retrieval_mode == "hybrid":
+                self.bm25 = self._load_bm25()
+            self.logger.log_interaction(
+                interaction_type="vector_base_reloaded",
+                data={"generation": self._generation, "total": base.index.ntotal},
+                level=logging.INFO
+            )
+            return
+        for name in manifest["segments"]:
+            if name not in self._segments:
+                for ids, docs, vectors in self._log.read([name]):
+                    self.delta.add(ids, docs, vectors)
+                self._segments.add(name)
+        self._manifest_stamp = self._log.stamp()
+
+    def flush(self) -> int:
+        """Persist this process's additions since the last flush as one segment"""
+        with self._write_lock, self._log.locked():
+            return self._flush_locked()
+
+    def _flush_locked(self) -> int:
+        # Other workers' segments first, so self.delta keeps the log's order
+        self._sync_locked()
+        with self._delta_lock:
+            end = len(self.pending)
+        if not end:
+            return 0
+        ids, docs, vectors = self.pending.slice(0, end)
+        name = self._log.append_locked(ids, docs, vectors)
+        with self._delta_lock:
+            rest = DeltaStore(self.pending.dimension)
+            rest.add(*self.pending.slice(end, len(self.pending)))
+            self.delta.add(ids, docs, vectors)
+            self.pending = rest
+        self._segments.add(name)
+        self._manifest_stamp = self._log.stamp()
+        return end
+
+    def compact(self) -> int:
+        """
+        Merge every logged segment into a copy of the base index, swap it in,
+        save it, and only then drop the segments from the log. Holds the log
+        lock throughout, so no worker appends to or reloads from a half-written
+        state; they reload the new base on their next sync.
+        """
+        with self._write_lock, self._log.locked():
+            self._flush_locked()
+            with self._delta_lock:
+                delta = self.delta
+            count = len(delta)
+            if not count:
+                return 0
+            segments = self._log.segments()
+            merged = self._merged_store(*delta.slice(0, count))
+
+            with self._delta_lock:
+                self.vectorstore, self.delta = merged, DeltaStore(delta.dimension)
+            self.save()
+            self._generation = self._log.truncate_locked(segments)
+            self._segments = set()
+            self._manifest_stamp = self._log.stamp()
+
+        self.logger.log_interaction(
+            interaction_type="vector_delta_compacted",
+            data={"chunks": count, "segments": len(segments), "total": merged.index.ntotal},
+            level=logging.INFO
+        )
+        return count
+
+    def _merged_store(self, ids: List[str], docs: List[Document], vectors: np.ndarray) -> FAISS:
+        # A copy, so searches in flight keep using the base they started with
+        import faiss
+
+        base = self.vectorstore
+        merged = FAISS(
+            embedding_function=self.embedding_model,
+            index=faiss.clone_index(base.index),
+            docstore=InMemoryDocstore(dict(base.docstore._dict)),
+            index_to_docstore_id=dict(base.index_to_docstore_id)
+        )
+        merged.add_embeddings(
+            list(zip([doc.page_content for doc in docs], vectors.tolist())),
+            metadatas=[doc.metadata for doc in docs],
+            ids=ids
+        )
+        return merged
+
+    def close(self) -> None:
+        """Stop the flusher and persist whatever is still only in memory"""
+        if self._flusher is not None:
+            self._stop.set()
+            self._wake.set()
+            self._flusher.join()
+            self._flusher = None
+            self.flush()
     
     def save(self) -> None:
         """Save the vector store to disk"""
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.vectorstore.save_local(str(self.db_path))
\ No newline at end of file
+        self.vectorstore.save_local(str(self.db_path))
+        # Keep the compact docstore used by mmap loading in step
+        export_compact_docstore(self.vectorstore, self.db_path)
+        bm25 = BM25Index.from_vectorstore(self.vectorstore)
+        bm25.save(self.db_path)
+        if self.retrieval_mode == "hybrid":
+            self.bm25 = bm25
\ No newline at end of file
@@ -9,6 +9,11 @@ class EmotionalAnalysis(BaseModel):
     coping_strategies: List[str] = []
     confidence_score: float = Field(..., ge=0, le=1)
 
+class TherapistTurn(BaseModel):
+    """Single-shot structured output: emotion analysis and reply in one call"""
+    emotion_analysis: EmotionalAnalysis
+    response: str = Field(..., min_length=1, description="Therapist reply to the user")
+
 class ContextInfo(BaseModel):
     query: str = ""
     web_context: str = ""
@@ -1,12 +1,10 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+import json
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
-from datetime import datetime
 from src.llm.models.schemas import ConversationResponse, SessionData
 from src.llm.utils.logging import TheryBotLogger
-from src.llm.memory.history import RedisHistory
-from src.llm.memory.memory_manager import RedisMemoryManager
-from src.llm.memory.session_manager import SessionManager
-from src.llm.agents.conversation_agent import ConversationAgent
+from src.llm.core.registry import registry
 
 router = APIRouter(
     prefix="/api/v1",
@@ -14,18 +12,17 @@ router = APIRouter(
     responses={500: {"description": "Internal Server Error"}}
 )
 
-# Initialize core components
-session_manager = SessionManager()
-memory_manager = RedisMemoryManager()
-history = RedisHistory()
+# Core components are shared with the rest of the process and resolved per
+# request, so importing this module (e.g. in a preloading gunicorn master)
+# opens no Redis connections; they are built on warmup or first use.
+# Handlers only use the *_async memory methods so Redis never blocks the loop
 logger = TheryBotLogger()
-conversation_agent = ConversationAgent()
 
 @router.post("/users", response_model=dict)
 async def create_user():
     """Create a new user ID"""
     try:
-        user_id, _ = session_manager.generate_ids()
+        user_id, _ = await registry.session_manager.generate_ids_async()
         return {"user_id": user_id}
     except Exception as e:
         logger.log_interaction("user_creation_failed", {"error": str(e)}, level=40)
@@ -35,7 +32,7 @@ async def create_user():
 async def create_session(user_id: str):
     """Create a new session ID for a user"""
     try:
-        _, session_id = session_manager.generate_ids(existing_user_id=user_id)
+        _, session_id = await registry.session_manager.generate_ids_async(existing_user_id=user_id)
         return SessionData(
             user_id=user_id,
             session_id=session_id,
@@ -50,10 +47,10 @@ async def create_session(user_id: str):
 async def get_messages(session_id: str, limit: int = 50):
     """Get message history for a session"""
     try:
-        if not session_manager.validate_session(session_id):
+        if not await registry.session_manager.validate_session_async(session_id):
             raise HTTPException(404, "Session not found")
             
-        messages = history.get_conversation_history(session_id, limit=limit)
+        messages = await registry.history.get_conversation_history_async(session_id, limit=limit)
         return [msg["response"] for msg in messages]
     except HTTPException:
         raise
@@ -62,18 +59,14 @@ async def get_messages(session_id: str, limit: int = 50):
         raise HTTPException(500, "Message retrieval failed")
 
 @router.post("/sessions/{session_id}/messages", response_model=ConversationResponse)
-async def create_message(
-    session_id: str,
-    message: str,
-    background_tasks: BackgroundTasks
-):
+async def create_message(session_id: str, message: str):
     """Process and store a new message"""
     try:
-        user_id = session_manager.validate_session(session_id)
+        user_id = await registry.session_manager.validate_session_async(session_id)
         if not user_id:
             raise HTTPException(404, "Invalid session")
             
-        response = await conversation_agent.process_async(
+        response = await registry.conversation_agent.process_async(
             query=message,
             session_data=SessionData(
                 user_id=user_id,
@@ -82,17 +75,57 @@ async def create_message(
                 is_new_session=False
             )
         )
-        
-        background_tasks.add_task(
-            memory_manager.store_conversation,
-            session_id,
-            datetime.now().isoformat(),
-            response
-        )
-        
+        # process_async has already stored the turn in memory and history
         return response
     except HTTPException:
         raise
     except Exception as e:
         logger.log_interaction("message_processing_failed", {"error": str(e)}, level=40)
-        raise HTTPException(500, "Message processing failed")
\ No newline at end of file
+        raise HTTPException(500, "Message processing failed")
+
+def _sse_event(event: str, data: str) -> str:
+    """Format a single server-sent event frame"""
+    return f"event: {event}\ndata: {data}\n\n"
+
+@router.post("/sessions/{session_id}/messages/stream")
+async def stream_message(session_id: str, message: str):
+    """
+    Process a new message and stream the reply as server-sent events.
+
+    Emits `token` events as text arrives, then a single `done` event carrying
+    the stored ConversationResponse (or an `error` event on failure).
+    """
+    try:
+        user_id = await registry.session_manager.validate_session_async(session_id)
+    except Exception as e:
+        logger.log_interaction("message_streaming_failed", {"error": str(e)}, level=40)
+        raise HTTPException(500, "Message processing failed")
+    if not user_id:
+        raise HTTPException(404, "Invalid session")
+
+    session_data = SessionData(
+        user_id=user_id,
+        session_id=session_id,
+        is_new_user=False,
+        is_new_session=False
+    )
+
+    async def event_stream():
+        try:
+            async for item in registry.conversation_agent.process_stream_async(
+                query=message,
+                session_data=session_data
+            ):
+                if isinstance(item, ConversationResponse):
+                    yield _sse_event("done", json.dumps(item.dict()))
+                else:
+                    yield _sse_event("token", json.dumps({"text": item}))
+        except Exception as e:
+            logger.log_interaction("message_streaming_failed", {"error": str(e)}, level=40)
+            yield _sse_event("error", json.dumps({"detail": "Message processing failed"}))
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
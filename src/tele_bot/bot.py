@@ -10,9 +10,9 @@ from telegram.ext import (
     CallbackContext,
 )
 
-from src.llm.agents.conversation_agent import ConversationAgent
 from src.llm.models.schemas import SessionData
 from src.llm.core.config import settings
+from src.llm.core.registry import registry
 
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -20,8 +20,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-conversation_agent = ConversationAgent()
-
 MAIN_KEYBOARD = ReplyKeyboardMarkup(
     [["💬 Start Chatting"], ["ℹ️ About", "🛠 Help"]],
     resize_keyboard=True,
@@ -87,7 +85,7 @@ async def handle_message(update: Update, context: CallbackContext) -> None:
     try:
         session_data = context.user_data.get("session_data")
 
-        response = await conversation_agent.process_async(
+        response = await registry.conversation_agent.process_async(
             query=text,
             session_data=session_data,
         )
@@ -113,12 +111,24 @@ async def error_handler(update: object, context: CallbackContext) -> None:
         )
 
 
+async def _shutdown_registry(application: Application) -> None:
+    await registry.shutdown()
+
+
 def main() -> None:
     """Configure and start the bot."""
     if not settings.TELEGRAM_BOT_TOKEN:
         raise RuntimeError("TELEGRAM_BOT_TOKEN is not set in .env")
 
-    application = Application.builder().token(settings.TELEGRAM_BOT_TOKEN).build()
+    # Build the shared agent, index and Redis pool before polling starts
+    registry.warmup()
+
+    application = (
+        Application.builder()
+        .token(settings.TELEGRAM_BOT_TOKEN)
+        .post_shutdown(_shutdown_registry)
+        .build()
+    )
 
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("about", about))
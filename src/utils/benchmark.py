@@ -0,0 +1,178 @@
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from src.llm.core.config import settings
+from src.llm.memory.partitioned_store import PartitionedVectorSearch, load_vector_search
+from src.llm.memory.vector_store import default_embedding_model, ranked_search
+
+PERCENTILES = (50, 95, 99)
+
+
+def load_queries(path: str) -> List[Dict[str, Any]]:
+    """
+    JSONL, one labelled query per line:
+    {"query": "...", "relevant_sources": ["anxiety/cbt.pdf"], "relevant_text": ["thought records"]}
+    A result is relevant if its source is listed or its text contains a listed
+    snippet, so labels survive re-chunking and rebuilding the index.
+    """
+    with open(path) as f:
+        queries = [json.loads(line) for line in f if line.strip()]
+    for query in queries:
+        if not query.get("relevant_sources") and not query.get("relevant_text"):
+            raise ValueError(f"Query {query['query']!r} has no relevance labels")
+    return queries
+
+
+def load_configs(args) -> List[Dict[str, Any]]:
+    if args.config:
+        with open(args.config) as f:
+            return json.load(f)
+    return [
+        {
+            "name": Path(db_path).name,
+            "db_path": db_path,
+            "retrieval_mode": args.mode,
+            "embedding_backend": args.backend,
+            "use_mmap": args.mmap,
+        }
+        for db_path in args.db
+    ]
+
+
+def _labels(query: Dict[str, Any]) -> List[tuple]:
+    return (
+        [("source", s) for s in query.get("relevant_sources", [])]
+        + [("text", t.lower()) for t in query.get("relevant_text", [])]
+    )
+
+
+def _satisfies(doc: Document, label: tuple) -> bool:
+    kind, value = label
+    if kind == "source":
+        return doc.metadata.get("source") == value
+    return value in doc.page_content.lower()
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    return {f"p{p}": round(float(np.percentile(samples, p)), 3) for p in PERCENTILES}
+
+
+def _directory_bytes(path: Path) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path) for name in names
+    )
+
+
+def _apply_search_params(store: Any, nprobe: Optional[int], ef_search: Optional[int]) -> None:
+    stores = store.stores.values() if isinstance(store, PartitionedVectorSearch) else [store]
+    for s in stores:
+        s.index_spec.apply_search_params(s.vectorstore.index, nprobe=nprobe, ef_search=ef_search)
+
+
+def run_config(
+    config: Dict[str, Any],
+    queries: List[Dict[str, Any]],
+    embedding_model: Embeddings,
+    k: int,
+    repeat: int = 1
+) -> Dict[str, Any]:
+    if not Path(config["db_path"]).exists():
+        raise FileNotFoundError(f"No index at {config['db_path']}")
+    started = time.perf_counter()
+    store = load_vector_search(
+        embedding_model=embedding_model,
+        db_path=Path(config["db_path"]),
+        use_mmap=config.get("use_mmap", False),
+        retrieval_mode=config.get("retrieval_mode", "dense"),
+        write_buffered=False
+    )
+    load_seconds = time.perf_counter() - started
+    if config.get("nprobe") or config.get("ef_search"):
+        _apply_search_params(store, config.get("nprobe"), config.get("ef_search"))
+
+    sources = store.search_sources()
+    # Page in the index and initialise kernels before timing
+    ranked_search(sources, queries[0]["query"], k)
+
+    recalls, reciprocal_ranks, search_ms, embed_ms = [], [], [], []
+    for query in queries:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            embedding_model.embed_query(query["query"])
+            embed_ms.append((time.perf_counter() - t0) * 1000)
+
+            t0 = time.perf_counter()
+            results = ranked_search(sources, query["query"], k)
+            search_ms.append((time.perf_counter() - t0) * 1000)
+
+        labels = _labels(query)
+        recalls.append(sum(any(_satisfies(doc, label) for doc in results) for label in labels) / len(labels))
+        first_hit = next(
+            (rank for rank, doc in enumerate(results, start=1) if any(_satisfies(doc, label) for label in labels)),
+            None
+        )
+        reciprocal_ranks.append(1.0 / first_hit if first_hit else 0.0)
+
+    return {
+        **config,
+        f"recall@{k}": round(float(np.mean(recalls)), 4),
+        "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+        # End to end, including the query embedding
+        "search_ms": _percentiles(search_ms),
+        "embedding_ms": _percentiles(embed_ms),
+        "index_bytes": _directory_bytes(Path(config["db_path"])),
+        "load_seconds": round(load_seconds, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retrieval quality and latency of vector indexes")
+    parser.add_argument("--queries", required=True, help="Labelled query set (JSONL)")
+    parser.add_argument("--db", action="append", default=[], help="Index directory; repeat to compare several")
+    parser.add_argument("--config", help="JSON list of configurations instead of --db")
+    parser.add_argument("--mode", choices=("dense", "hybrid"), default=settings.RETRIEVAL_MODE)
+    parser.add_argument("--backend", choices=("torch", "onnx"), default=settings.EMBEDDING_BACKEND)
+    parser.add_argument("--mmap", action="store_true")
+    parser.add_argument("--k", type=int, default=settings.VECTOR_SEARCH_K)
+    parser.add_argument("--repeat", type=int, default=1, help="Timed runs per query")
+    parser.add_argument("--output", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    configs = load_configs(args)
+    if not configs:
+        parser.error("Give at least one --db or a --config file")
+    queries = load_queries(args.queries)
+
+    # One embedding model per backend, loaded outside the per-index timings
+    models: Dict[str, Embeddings] = {}
+    model_load_seconds: Dict[str, float] = {}
+    results = []
+    for config in configs:
+        backend = config.setdefault("embedding_backend", settings.EMBEDDING_BACKEND)
+        if backend not in models:
+            started = time.perf_counter()
+            models[backend] = default_embedding_model(backend=backend)
+            model_load_seconds[backend] = round(time.perf_counter() - started, 3)
+        results.append(run_config(config, queries, models[backend], args.k, args.repeat))
+
+    report = {
+        "queries": len(queries),
+        "k": args.k,
+        "embedding_load_seconds": model_load_seconds,
+        "configurations": results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import json
+import os
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+SIGNATURES_FILE = "minhash.signatures.npy"
+IDS_FILE = "minhash.ids.json"
+
+# Mersenne prime for the universal hash family; a * x stays below 2^63
+_PRIME = (1 << 31) - 1
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class MinHashDeduplicator:
+    """
+    Near-duplicate detection for chunks with MinHash signatures over word
+    shingles and LSH banding.
+
+    Candidates that share any LSH band are confirmed by the estimated Jaccard
+    similarity of their signatures, so `threshold` is the real cut-off and the
+    banding only needs to be permissive. Signatures are persisted next to the
+    index so incremental runs also catch duplicates of already-indexed chunks.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.85,
+        num_perm: int = 128,
+        bands: int = 32,
+        shingle_size: int = 5,
+        seed: int = 1
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+
+        self._ids: List[str] = []
+        self._signatures: List[np.ndarray] = []
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        self._removed: set = set()
+
+    def __len__(self) -> int:
+        return len(self._ids) - len(self._removed)
+
+    def signature(self, text: str) -> np.ndarray:
+        tokens = _TOKEN_PATTERN.findall(text.lower())
+        size = min(self.shingle_size, len(tokens)) or 1
+        shingles = {" ".join(tokens[i:i + size]) for i in range(max(len(tokens) - size + 1, 1))}
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) % _PRIME for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+        return ((self._a * hashes + self._b) % _PRIME).min(axis=1).astype(np.uint32)
+
+    def find_duplicate(self, signature: np.ndarray) -> Optional[str]:
+        """Id of an indexed chunk at or above the threshold, if any"""
+        seen = set()
+        for key in self._band_keys(signature):
+            for slot in self._buckets.get(key, ()):
+                if slot in seen or slot in self._removed:
+                    continue
+                seen.add(slot)
+                if np.mean(self._signatures[slot] == signature) >= self.threshold:
+                    return self._ids[slot]
+        return None
+
+    def add(self, chunk_id: str, signature: np.ndarray) -> None:
+        slot = len(self._ids)
+        self._ids.append(chunk_id)
+        self._signatures.append(signature)
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, []).append(slot)
+
+    def filter(self, items: Iterable[Tuple[str, str]]) -> List[int]:
+        """
+        Index (id, text) pairs in order, skipping near-duplicates of anything
+        indexed before them. Returns the positions that were kept.
+        """
+        return self.partition(items)[0]
+
+    def partition(self, items: Iterable[Tuple[str, str]]) -> Tuple[List[int], Dict[int, str]]:
+        """
+        Like `filter`, but also returns, for every skipped position, the id
+        of the indexed chunk it duplicates
+        """
+        kept, duplicates = [], {}
+        for i, (chunk_id, text) in enumerate(items):
+            signature = self.signature(text)
+            duplicate = self.find_duplicate(signature)
+            if duplicate is None:
+                self.add(chunk_id, signature)
+                kept.append(i)
+            else:
+                duplicates[i] = duplicate
+        return kept, duplicates
+
+    def remove(self, chunk_ids: Iterable[str]) -> None:
+        # Tombstones; dropped slots are compacted away on save
+        chunk_ids = set(chunk_ids)
+        self._removed.update(slot for slot, chunk_id in enumerate(self._ids) if chunk_id in chunk_ids)
+
+    def _band_keys(self, signature: np.ndarray) -> Iterable[Tuple[int, bytes]]:
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, SIGNATURES_FILE))
+
+    def save(self, directory: str) -> None:
+        live = [slot for slot in range(len(self._ids)) if slot not in self._removed]
+        signatures = (
+            np.stack([self._signatures[slot] for slot in live])
+            if live else np.empty((0, self.num_perm), dtype=np.uint32)
+        )
+        tmp_path = os.path.join(directory, SIGNATURES_FILE + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, signatures)
+        os.replace(tmp_path, os.path.join(directory, SIGNATURES_FILE))
+        tmp_path = os.path.join(directory, IDS_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump([self._ids[slot] for slot in live], f)
+        os.replace(tmp_path, os.path.join(directory, IDS_FILE))
+
+    def load(self, directory: str) -> None:
+        signatures = np.load(os.path.join(directory, SIGNATURES_FILE))
+        with open(os.path.join(directory, IDS_FILE)) as f:
+            ids = json.load(f)
+        if signatures.shape[1:] != (self.num_perm,):
+            raise ValueError(f"Stored signatures have {signatures.shape[1:]} permutations, expected {self.num_perm}")
+        for chunk_id, signature in zip(ids, signatures):
+            self.add(chunk_id, signature)
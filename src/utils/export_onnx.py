@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from src.llm.core.config import settings
+from src.llm.memory.onnx_embeddings import CONFIG_FILE, MODEL_FILE, TOKENIZER_FILE, OnnxEmbeddings
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Representative chat-turn queries used when no --texts file is given
+PARITY_TEXTS = [
+    "I've been feeling really anxious about work lately",
+    "How does CBT help with negative thinking?",
+    "I can't sleep and my mind keeps racing at night",
+    "What is acceptance and commitment therapy (ACT)?",
+    "My therapist mentioned sertraline, what are common side effects?",
+    "I feel lonely even when I'm around other people",
+    "How can I support a friend who is grieving?",
+    "Breathing exercises for panic attacks",
+    "I keep procrastinating and then hating myself for it",
+    "Is it normal to feel numb after a breakup?",
+    "ok",
+    "What are the early signs of burnout and how do I recover from it without quitting my job?",
+]
+
+
+def export(model_name: str, output_dir: Path, opset: int = 17, keep_fp32: bool = False) -> Path:
+    """Export the transformer to ONNX and quantize its weights to int8"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError:
+        raise RuntimeError(
+            "Exporting requires the onnx extra (poetry install -E onnx, "
+            "or pip install -r requirements-onnx.txt)"
+        )
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    fp32_path = output_dir / "model.fp32.onnx"
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True
+        )
+
+    quantize_dynamic(str(fp32_path), str(output_dir / MODEL_FILE), weight_type=QuantType.QInt8)
+    if not keep_fp32:
+        os.remove(fp32_path)
+
+    tokenizer.backend_tokenizer.save(str(output_dir / TOKENIZER_FILE))
+    (output_dir / CONFIG_FILE).write_text(json.dumps({
+        "model_name": model_name,
+        "max_length": st_model.max_seq_length,
+        "pad_token_id": tokenizer.pad_token_id,
+        "normalize": True,
+    }, indent=2))
+    return output_dir
+
+
+def _median_ms(embeddings: Embeddings, texts: List[str]) -> float:
+    timings = []
+    for text in texts:
+        started = time.perf_counter()
+        embeddings.embed_query(text)
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 3)
+
+
+def parity_check(
+    candidate: Embeddings,
+    reference: Embeddings,
+    texts: List[str],
+    db_path: Optional[Path] = None,
+    k: int = 5
+) -> Dict[str, float]:
+    """
+    Compare candidate query vectors against the reference model: cosine
+    similarity per text and, if an index exists at `db_path`, the overlap of
+    the top-k results each one retrieves.
+    """
+    candidate_vectors = np.asarray([candidate.embed_query(t) for t in texts], dtype=np.float32)
+    reference_vectors = np.asarray([reference.embed_query(t) for t in texts], dtype=np.float32)
+    cosines = (candidate_vectors * reference_vectors).sum(axis=1) / (
+        np.linalg.norm(candidate_vectors, axis=1) * np.linalg.norm(reference_vectors, axis=1)
+    )
+    report = {
+        "texts": len(texts),
+        "min_cosine": round(float(cosines.min()), 5),
+        "mean_cosine": round(float(cosines.mean()), 5),
+        "candidate_median_ms": _median_ms(candidate, texts),
+        "reference_median_ms": _median_ms(reference, texts),
+    }
+
+    index_file = Path(db_path) / "index.faiss" if db_path else None
+    if index_file is not None and index_file.exists():
+        import faiss
+
+        index = faiss.read_index(str(index_file))
+        _, candidate_ids = index.search(candidate_vectors, k)
+        _, reference_ids = index.search(reference_vectors, k)
+        overlaps = [
+            len(set(c) & set(r)) / k for c, r in zip(candidate_ids.tolist(), reference_ids.tolist())
+        ]
+        report[f"top{k}_overlap"] = round(float(np.mean(overlaps)), 4)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export an int8 ONNX query embedding model and check parity")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--output", default=settings.ONNX_EMBEDDING_PATH)
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--keep-fp32", action="store_true", help="Keep the unquantized export")
+    parser.add_argument("--texts", help="File with one parity query per line")
+    parser.add_argument("--db-path", default=settings.VECTOR_DB_PATH, help="Index used for top-k overlap")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--min-cosine", type=float, default=0.98, help="Fail below this similarity")
+    parser.add_argument("--check-only", action="store_true", help="Skip the export, only check parity")
+    args = parser.parse_args()
+
+    output_dir = Path(args.output)
+    if not args.check_only:
+        export(args.model, output_dir, opset=args.opset, keep_fp32=args.keep_fp32)
+        print(f"Exported {args.model} to {output_dir}")
+
+    texts = PARITY_TEXTS
+    if args.texts:
+        with open(args.texts) as f:
+            texts = [line.strip() for line in f if line.strip()]
+
+    from src.llm.memory.vector_store import default_embedding_model
+
+    report = parity_check(
+        OnnxEmbeddings(model_dir=str(output_dir)),
+        default_embedding_model(backend="torch"),
+        texts,
+        db_path=Path(args.db_path),
+        k=args.k
+    )
+    print(json.dumps(report, indent=2))
+    if report["min_cosine"] < args.min_cosine:
+        print(f"Parity check failed: min cosine {report['min_cosine']} < {args.min_cosine}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional
+import numpy as np
+from langchain_core.documents import Document
+from src.utils.pdf_splitter import file_metadata, load_and_split_pdf
+from src.utils.dedup import MinHashDeduplicator
+from src.utils.vector_db import VectorDatabase, add_index_arguments, parse_index_spec
+from src.llm.memory.index_spec import IndexSpec
+from src.llm.memory.partitioned_store import (
+    FILTER_FIELDS, PARTITIONS_DIR, PARTITIONS_FILE, partition_name, write_partition_manifest
+)
+
+MANIFEST_FILE = "ingest_manifest.json"
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def find_pdfs(pdf_directory: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(pdf_directory, "**", "*.pdf"), recursive=True))
+
+
+def chunk_ids(path: str, sha256: str, count: int) -> List[str]:
+    """
+    Ids for a file's chunks. The path is part of the id, so byte-identical
+    files at different paths never collide
+    """
+    path_digest = hashlib.sha1(os.path.normpath(path).encode("utf-8")).hexdigest()[:12]
+    return [f"{path_digest}-{sha256[:16]}-{i}" for i in range(count)]
+
+
+def dedup_dependents(manifest: Dict[str, Dict], changed: List[str]) -> List[str]:
+    """
+    Files whose chunks were dropped as near-duplicates of chunks in `changed`,
+    transitively: once those chunks go, the dropped ones must be re-evaluated
+    or their content vanishes from the index
+    """
+    changed = set(changed)
+    dependents: set = set()
+    frontier = set(changed)
+    while frontier:
+        frontier = {
+            path for path, entry in manifest.items()
+            if path not in changed and path not in dependents
+            and frontier.intersection(entry.get("deduped_against", ()))
+        }
+        dependents |= frontier
+    return sorted(dependents)
+
+
+def batched(items: List, size: int) -> Iterator[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class IngestionPipeline:
+    """
+    Incremental PDF ingestion into the FAISS vector database.
+
+    PDFs are extracted and split in a process pool with a bounded number of
+    files in flight, chunks are embedded in fixed-size batches, and a
+    manifest of per-file content hashes means re-runs only embed new or
+    changed files. Chunks of changed or deleted files are removed from the
+    existing index before the new ones are merged in. Every chunk is tagged
+    with its file's source, topic and language (see `file_metadata`), and
+    near-duplicate chunks are dropped before embedding (see
+    `MinHashDeduplicator`). The manifest records which files a file's dropped
+    chunks duplicated, and the file is re-ingested when any of them changes.
+    """
+
+    def __init__(
+        self,
+        pdf_directory: str,
+        vector_db: VectorDatabase,
+        workers: Optional[int] = None,
+        batch_size: int = 512,
+        full_rebuild: bool = False,
+        paths: Optional[List[str]] = None,
+        dedup_threshold: Optional[float] = 0.85
+    ):
+        self.pdf_directory = pdf_directory
+        # Explicit subset of the directory, used when ingesting one partition
+        self.paths = paths
+        self.vector_db = vector_db
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.full_rebuild = full_rebuild
+        self.manifest_path = os.path.join(vector_db.persist_directory, MANIFEST_FILE)
+        self.vectorstore = None
+        self.spec: IndexSpec = vector_db.index_spec
+        # Chunks held back until a trainable index has enough vectors to train on
+        self._untrained: List[tuple] = []
+        self.dedup = MinHashDeduplicator(dedup_threshold) if dedup_threshold is not None else None
+
+    def run(self) -> Dict[str, float]:
+        started = time.perf_counter()
+        manifest = {} if self.full_rebuild else self._load_manifest()
+        paths = self.paths if self.paths is not None else find_pdfs(self.pdf_directory)
+        current = {path: file_sha256(path) for path in sorted(paths)}
+        pending = [path for path, sha in current.items() if manifest.get(path, {}).get("sha256") != sha]
+        removed = [path for path in manifest if path not in current]
+        reevaluated = [path for path in dedup_dependents(manifest, pending + removed) if path in current]
+        pending += reevaluated
+
+        if not self.full_rebuild:
+            self.vectorstore = self.vector_db.load_store()
+            if self.vectorstore is not None:
+                self.spec = IndexSpec.load(self.vector_db.persist_directory)
+            self._load_dedup()
+
+        stale_ids = [
+            chunk_id
+            for path in pending + removed if path in manifest
+            for chunk_id in manifest[path]["ids"]
+        ]
+        if stale_ids and self.vectorstore is not None:
+            # Raises for index types without removal support (HNSW); use --full then
+            self.vectorstore.delete(stale_ids)
+        if self.dedup is not None:
+            self.dedup.remove(stale_ids)
+        for path in removed:
+            manifest.pop(path)
+        # Which file each indexed chunk belongs to, to record dedup dependencies
+        owners = {
+            chunk_id: path
+            for path, entry in manifest.items() if path not in pending
+            for chunk_id in entry["ids"]
+        }
+
+        chunks_added = chunks_dropped = text_bytes_dropped = 0
+        for path, chunks in self._extract(pending):
+            ids = chunk_ids(path, current[path], len(chunks))
+            deduped_against: set = set()
+            if self.dedup is not None:
+                kept, duplicates = self.dedup.partition(zip(ids, [doc.page_content for doc in chunks]))
+                deduped_against = {owners[chunk_id] for chunk_id in duplicates.values() if chunk_id in owners}
+                deduped_against.discard(path)
+                kept_set = set(kept)
+                text_bytes_dropped += sum(
+                    len(doc.page_content.encode("utf-8"))
+                    for i, doc in enumerate(chunks) if i not in kept_set
+                )
+                chunks_dropped += len(chunks) - len(kept)
+                ids, chunks = [ids[i] for i in kept], [chunks[i] for i in kept]
+            for batch in batched(list(zip(ids, chunks)), self.batch_size):
+                self._add_batch([chunk_id for chunk_id, _ in batch], [doc for _, doc in batch])
+            manifest[path] = {"sha256": current[path], "ids": ids, "deduped_against": sorted(deduped_against)}
+            owners.update((chunk_id, path) for chunk_id in ids)
+            chunks_added += len(chunks)
+            print(f"Ingested {path}: {len(chunks)} chunks")
+        self._flush_untrained(final=True)
+
+        if self.vectorstore is not None and (pending or removed):
+            self.vector_db.persist(self.vectorstore, self.spec)
+            if self.dedup is not None:
+                self.dedup.save(self.vector_db.persist_directory)
+            # Manifest last, so a crash before this point only causes re-embedding
+            self._save_manifest(manifest)
+
+        return {
+            "files_total": len(current),
+            "files_ingested": len(pending),
+            "files_removed": len(removed),
+            "files_reevaluated": len(reevaluated),
+            "chunks_added": chunks_added,
+            "chunks_removed": len(stale_ids),
+            "dedup": {
+                "chunks_dropped": chunks_dropped,
+                "text_bytes_saved": text_bytes_dropped,
+                "index_bytes_saved": chunks_dropped * self._vector_code_size(),
+            },
+            "seconds": round(time.perf_counter() - started, 2),
+            "embedding": self.vector_db.embeddings.stats.as_dict(),
+        }
+
+    def _load_dedup(self) -> None:
+        """Signatures of already-indexed chunks, so new files are checked against them too"""
+        if self.dedup is None:
+            return
+        if MinHashDeduplicator.exists(self.vector_db.persist_directory):
+            self.dedup.load(self.vector_db.persist_directory)
+        elif self.vectorstore is not None:
+            # Store built before dedup existed; sign its chunks once
+            for position in range(self.vectorstore.index.ntotal):
+                chunk_id = self.vectorstore.index_to_docstore_id[position]
+                doc = self.vectorstore.docstore.search(chunk_id)
+                self.dedup.add(chunk_id, self.dedup.signature(doc.page_content))
+
+    def _vector_code_size(self) -> int:
+        """Bytes one vector occupies in the index"""
+        if self.vectorstore is None:
+            return 0
+        try:
+            return self.vectorstore.index.sa_code_size()
+        except Exception:
+            return self.vectorstore.index.d * 4
+
+    def _extract(self, paths: List[str]) -> Iterator[tuple]:
+        """Yield (path, chunks) as workers finish, keeping at most 2x workers files in flight"""
+        if not paths:
+            return
+        queue = list(paths)
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            in_flight = {}
+            while queue or in_flight:
+                while queue and len(in_flight) < self.workers * 2:
+                    path = queue.pop(0)
+                    future = pool.submit(
+                        load_and_split_pdf, path, metadata=file_metadata(path, self.pdf_directory)
+                    )
+                    in_flight[future] = path
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = in_flight.pop(future)
+                    yield path, future.result()
+
+    def _add_batch(self, ids: List[str], docs: List[Document]) -> None:
+        texts = [doc.page_content for doc in docs]
+        vectors = np.asarray(self.vector_db.embeddings.embed_documents(texts), dtype="float32")
+
+        if self.vectorstore is None:
+            self.spec = self.vector_db.index_spec
+            self.vectorstore = self.vector_db.new_store(self.spec, vectors.shape[1])
+
+        if not self.vectorstore.index.is_trained:
+            self._untrained.append((ids, docs, vectors))
+            self._flush_untrained()
+            return
+        self._add_vectors(ids, docs, vectors)
+
+    def _flush_untrained(self, final: bool = False) -> None:
+        if not self._untrained:
+            return
+        buffered = sum(len(ids) for ids, _, _ in self._untrained)
+        if buffered < self.spec.nlist * 39 and not final:
+            return
+
+        vectors = np.concatenate([v for _, _, v in self._untrained])
+        fitted = self.spec.fitted_to(len(vectors))
+        if fitted != self.spec:
+            # Too few vectors for the requested nlist; rebuild the empty index smaller
+            self.spec = fitted
+            self.vectorstore = self.vector_db.new_store(self.spec, vectors.shape[1])
+        self.vectorstore.index.train(vectors)
+
+        for ids, docs, batch_vectors in self._untrained:
+            self._add_vectors(ids, docs, batch_vectors)
+        self._untrained = []
+
+    def _add_vectors(self, ids: List[str], docs: List[Document], vectors: np.ndarray) -> None:
+        self.vectorstore.add_embeddings(
+            list(zip([doc.page_content for doc in docs], vectors.tolist())),
+            metadatas=[doc.metadata for doc in docs],
+            ids=ids
+        )
+
+    def _load_manifest(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)["files"]
+
+    def _save_manifest(self, files: Dict[str, Dict]) -> None:
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"files": files}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+
+class PartitionedIngestion:
+    """
+    Ingests each partition of the corpus (the files sharing a value of
+    `partition_by`) into its own store under <db>/partitions/<name> with an
+    IngestionPipeline, then writes partitions.json with the metadata values
+    every partition holds so filtered search can skip the others.
+    """
+
+    def __init__(
+        self,
+        pdf_directory: str,
+        db_name: str,
+        partition_by: str = "topic",
+        index_spec: Optional[IndexSpec] = None,
+        **pipeline_kwargs
+    ):
+        if partition_by not in FILTER_FIELDS:
+            raise ValueError(f"Can only partition by one of {FILTER_FIELDS}")
+        self.pdf_directory = pdf_directory
+        self.db_name = db_name
+        self.partition_by = partition_by
+        self.index_spec = index_spec
+        self.pipeline_kwargs = pipeline_kwargs
+        self.db_path = os.path.join("vector_embedding", db_name)
+
+    def run(self) -> Dict[str, Any]:
+        metadata = {path: file_metadata(path, self.pdf_directory) for path in find_pdfs(self.pdf_directory)}
+        groups: Dict[str, List[str]] = {}
+        for path, meta in metadata.items():
+            groups.setdefault(partition_name(meta[self.partition_by]), []).append(path)
+
+        reports, partitions = {}, {}
+        embeddings = None
+        for name, paths in sorted(groups.items()):
+            vector_db = VectorDatabase(
+                db_name=os.path.join(self.db_name, PARTITIONS_DIR, name),
+                index_spec=self.index_spec,
+                embeddings=embeddings
+            )
+            # Load the embedding model once for all partitions
+            embeddings = vector_db.embeddings
+            pipeline = IngestionPipeline(self.pdf_directory, vector_db, paths=paths, **self.pipeline_kwargs)
+            reports[name] = pipeline.run()
+            partitions[name] = {
+                field: sorted({str(metadata[path][field]) for path in paths}) for field in FILTER_FIELDS
+            }
+
+        partitions_root = os.path.join(self.db_path, PARTITIONS_DIR)
+        removed = [
+            name for name in (os.listdir(partitions_root) if os.path.isdir(partitions_root) else [])
+            if name not in groups
+        ]
+        os.makedirs(self.db_path, exist_ok=True)
+        write_partition_manifest(self.db_path, self.partition_by, partitions)
+        # Only after the manifest stops listing them
+        for name in removed:
+            shutil.rmtree(os.path.join(partitions_root, name))
+
+        return {
+            "partition_by": self.partition_by,
+            "partitions": reports,
+            "partitions_removed": removed,
+            "embedding": embeddings.stats.as_dict() if embeddings is not None else {},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally ingest PDFs into the vector database")
+    parser.add_argument("--pdf-dir", default="./data/mental_health")
+    parser.add_argument("--db-name", default="mental_health_vector_db")
+    parser.add_argument("--workers", type=int, default=None, help="PDF extraction processes")
+    parser.add_argument("--batch-size", type=int, default=512, help="Chunks handed to the embedder at once")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and rebuild from scratch")
+    parser.add_argument(
+        "--partition-by",
+        choices=FILTER_FIELDS,
+        help="Build one sub-index per value of this metadata field"
+    )
+    parser.add_argument(
+        "--dedup-threshold",
+        type=float,
+        default=0.85,
+        help="Estimated Jaccard similarity at which a chunk counts as a near-duplicate"
+    )
+    parser.add_argument("--no-dedup", action="store_true", help="Keep near-duplicate chunks")
+    add_index_arguments(parser)
+    args = parser.parse_args()
+
+    if args.partition_by:
+        pipeline = PartitionedIngestion(
+            args.pdf_dir,
+            args.db_name,
+            partition_by=args.partition_by,
+            index_spec=parse_index_spec(args),
+            workers=args.workers,
+            batch_size=args.batch_size,
+            full_rebuild=args.full,
+            dedup_threshold=None if args.no_dedup else args.dedup_threshold
+        )
+        print(json.dumps(pipeline.run(), indent=2))
+        return
+
+    vector_db = VectorDatabase(db_name=args.db_name, index_spec=parse_index_spec(args))
+    pipeline = IngestionPipeline(
+        args.pdf_dir,
+        vector_db,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        full_rebuild=args.full,
+        dedup_threshold=None if args.no_dedup else args.dedup_threshold
+    )
+    print(json.dumps(pipeline.run(), indent=2))
+    # Search prefers partitions.json, so drop it once the single index is current
+    partitions_file = os.path.join(vector_db.persist_directory, PARTITIONS_FILE)
+    if os.path.exists(partitions_file):
+        os.remove(partitions_file)
+        print(f"Removed {partitions_file}; search now uses the unpartitioned index")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,74 @@
+import bisect
 import glob
+import json
+import os
+from typing import Dict, List, Optional, Tuple
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+DEFAULT_TOPIC = "general"
+DEFAULT_LANGUAGE = "en"
+
+
+def file_metadata(pdf_file: str, root: str) -> Dict[str, str]:
+    """
+    Metadata shared by every chunk of a PDF: its path relative to `root` as
+    source, its first sub-directory as topic, and a language. A sidecar
+    `<name>.pdf.json` can override these or add fields.
+    """
+    relative = os.path.relpath(pdf_file, root)
+    parts = relative.split(os.sep)
+    metadata = {
+        "source": "/".join(parts),
+        "topic": parts[0] if len(parts) > 1 else DEFAULT_TOPIC,
+        "language": DEFAULT_LANGUAGE,
+    }
+    sidecar = pdf_file + ".json"
+    if os.path.exists(sidecar):
+        with open(sidecar) as f:
+            metadata.update(json.load(f))
+    return metadata
+
+
+def pdf_sections(pdf_file: str) -> List[Tuple[int, str]]:
+    """Top-level outline (bookmark) entries as (page index, title), sorted by page"""
+    from pypdf import PdfReader
+
+    try:
+        reader = PdfReader(pdf_file)
+        sections = [
+            (reader.get_destination_page_number(item), item.title)
+            for item in reader.outline if not isinstance(item, list)
+        ]
+    except Exception:
+        # Missing or malformed outlines are common; chunks just get no section
+        return []
+    return sorted(sections)
+
+
+def load_and_split_pdf(
+    pdf_file,
+    chunk_size=CHUNK_SIZE,
+    chunk_overlap=CHUNK_OVERLAP,
+    metadata: Optional[Dict[str, str]] = None
+):
+    """Load and split a single PDF; module-level so process pools can pickle it"""
+    pages = PyPDFLoader(pdf_file).load()
+    if metadata is not None:
+        sections = pdf_sections(pdf_file)
+        section_pages = [page for page, _ in sections]
+        for page in pages:
+            page.metadata.update(metadata)
+            # Section whose outline entry starts on or before this page
+            index = bisect.bisect_right(section_pages, page.metadata.get("page", 0)) - 1
+            if index >= 0 and "section" not in metadata:
+                page.metadata["section"] = sections[index][1]
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return splitter.split_documents(pages)
+
+
 class DataExtractor:
     def __init__(self, pdf_directory):
         self.pdf_directory = pdf_directory
@@ -25,7 +92,7 @@ class DataExtractor:
 
     # Function to clean and split text
     def clean_and_split_text(self, documents):
-        splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+        splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
         split_docs = []
         print(f'Cleaning and splitting text from {len(documents)} documents')
         for doc in documents:
@@ -1,44 +1,127 @@
 import os
+import uuid
+import argparse
+from typing import Optional
+import numpy as np
 from src.utils.pdf_splitter import DataExtractor
-from langchain_community.embeddings import HuggingFaceEmbeddings  # Changed
+from src.utils.embedding_engine import BatchEmbeddingEngine
 from langchain_community.vectorstores import FAISS # Fixed import
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from src.llm.memory.mmap_docstore import export_compact_docstore
+from src.llm.memory.index_spec import IndexSpec, INDEX_TYPES
+from src.llm.memory.bm25_index import BM25Index
+
+# Upper bound on vectors used to train IVF/PQ quantizers
+MAX_TRAINING_VECTORS = 100_000
 
 class VectorDatabase:
-    def __init__(self, db_name):
+    def __init__(
+        self,
+        db_name,
+        index_spec: Optional[IndexSpec] = None,
+        embeddings: Optional[BatchEmbeddingEngine] = None
+    ):
         self.db_name = db_name  # Use parameter
         self.persist_directory = os.path.join("vector_embedding", self.db_name)  # Fixed path
+        self.index_spec = index_spec or IndexSpec()
         
-        # Correct embeddings for sentence-transformers model
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={"device": "cpu"},
-            encode_kwargs={
-                "padding": "max_length",
-                "max_length": 512,
-                "truncation": True,
-                "normalize_embeddings": True
-            }
+        # Length-bucketed, dynamically padded batches of the sentence-transformers model;
+        # partitioned ingestion passes one engine to every partition
+        self.embeddings = embeddings or BatchEmbeddingEngine(
+            model_name="sentence-transformers/all-MiniLM-L6-v2"
         )
 
     def create_db(self, pdf_data):
-        # Create and persist database in one step
-        self.vectDB = FAISS.from_documents(
-            documents=pdf_data,
-            embedding=self.embeddings
+        # Embed once, then build whichever FAISS index type the spec asks for
+        texts = [doc.page_content for doc in pdf_data]
+        embeddings = np.asarray(self.embeddings.embed_documents(texts), dtype="float32")
+
+        spec = self.index_spec.fitted_to(len(embeddings))
+        index = spec.build_index(embeddings.shape[1])
+        if spec.requires_training:
+            rng = np.random.default_rng(0)
+            sample = embeddings[rng.permutation(len(embeddings))[:MAX_TRAINING_VECTORS]]
+            index.train(sample)
+        index.add(embeddings)
+        spec.apply_search_params(index)
+
+        ids = [str(uuid.uuid4()) for _ in pdf_data]
+        self.vectDB = FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore(dict(zip(ids, pdf_data))),
+            index_to_docstore_id=dict(enumerate(ids))
         )
-        self.vectDB.save_local(self.persist_directory)
-        # No need for add_documents() or explicit persist() when using from_documents
+        self.persist(self.vectDB, spec)
+
+    def new_store(self, spec: IndexSpec, dimension: int) -> FAISS:
+        """Empty store for incremental ingestion; trainable indexes still need train()"""
+        return FAISS(
+            embedding_function=self.embeddings,
+            index=spec.build_index(dimension),
+            docstore=InMemoryDocstore({}),
+            index_to_docstore_id={}
+        )
+
+    def load_store(self) -> Optional[FAISS]:
+        """Load the persisted store for modification, or None if there is none yet"""
+        if not os.path.exists(os.path.join(self.persist_directory, "index.faiss")):
+            return None
+        return FAISS.load_local(
+            self.persist_directory,
+            self.embeddings,
+            allow_dangerous_deserialization=True
+        )
+
+    def persist(self, vectorstore: FAISS, spec: IndexSpec) -> None:
+        vectorstore.save_local(self.persist_directory)
+        # Compact docstore for memory-mapped loading (VECTOR_INDEX_MMAP)
+        export_compact_docstore(vectorstore, self.persist_directory)
+        # Keyword postings for hybrid retrieval (RETRIEVAL_MODE=hybrid)
+        BM25Index.from_vectorstore(vectorstore).save(self.persist_directory)
+        # Search parameters travel with the index
+        spec.save(self.persist_directory)
+
+def parse_index_spec(args) -> IndexSpec:
+    return IndexSpec(
+        index_type=args.index_type,
+        nlist=args.nlist,
+        nprobe=args.nprobe,
+        hnsw_m=args.hnsw_m,
+        ef_construction=args.ef_construction,
+        ef_search=args.ef_search,
+        pq_m=args.pq_m,
+        pq_nbits=args.pq_nbits,
+    )
+
+def add_index_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = IndexSpec()
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=defaults.index_type)
+    parser.add_argument("--nlist", type=int, default=defaults.nlist, help="IVF clusters")
+    parser.add_argument("--nprobe", type=int, default=defaults.nprobe, help="IVF clusters probed per query")
+    parser.add_argument("--hnsw-m", type=int, default=defaults.hnsw_m, help="HNSW links per node")
+    parser.add_argument("--ef-construction", type=int, default=defaults.ef_construction)
+    parser.add_argument("--ef-search", type=int, default=defaults.ef_search)
+    parser.add_argument("--pq-m", type=int, default=defaults.pq_m, help="PQ sub-quantizers (must divide the dimension)")
+    parser.add_argument("--pq-nbits", type=int, default=defaults.pq_nbits)
 
 def main():
-    pdf_directory = './data/mental_health'
+    parser = argparse.ArgumentParser(description="Build the FAISS vector database from PDFs")
+    parser.add_argument("--pdf-dir", default="./data/mental_health")
+    parser.add_argument("--db-name", default="mental_health_vector_db")
+    add_index_arguments(parser)
+    args = parser.parse_args()
+
+    pdf_directory = args.pdf_dir
     data_extractor = DataExtractor(pdf_directory)
     text_data = data_extractor.extract_text()
     text_data = data_extractor.clean_and_split_text(text_data)
     
     # Step 2: Create and load the vector database
-    vector_db = VectorDatabase(db_name="mental_health_vector_db")
+    vector_db = VectorDatabase(db_name=args.db_name, index_spec=parse_index_spec(args))
     vector_db.create_db(text_data)
     print("Vector embeddings have been generated and loaded successfully.")
+    print(f"Embedding throughput: {vector_db.embeddings.stats.as_dict()}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,25 @@
+from src.llm.memory.index_spec import IndexSpec
+
+
+def test_fitted_to_shrinks_pq_codebooks_for_small_corpora():
+    spec = IndexSpec(index_type="pq").fitted_to(100)
+    # 2**6 = 64 centroids per codebook is the most 100 vectors can train
+    assert spec.pq_nbits == 6
+    assert spec.factory_string() == "PQ16x6"
+
+
+def test_fitted_to_shrinks_nlist_and_pq_codebooks_for_ivfpq():
+    spec = IndexSpec(index_type="ivfpq").fitted_to(200)
+    assert spec.nlist == 5
+    assert spec.nprobe == 5
+    assert spec.pq_nbits == 7
+
+
+def test_fitted_to_falls_back_to_flat_without_enough_vectors():
+    assert IndexSpec(index_type="pq").fitted_to(1).index_type == "flat"
+    assert IndexSpec(index_type="ivfpq").fitted_to(0).index_type == "flat"
+
+
+def test_fitted_to_keeps_specs_large_corpora_can_train():
+    spec = IndexSpec(index_type="ivfpq", nlist=16)
+    assert spec.fitted_to(100_000) == spec
@@ -0,0 +1,42 @@
+import asyncio
+from unittest import mock
+import pytest
+
+pytest.importorskip("langchain_google_genai")
+
+from langchain_core.messages import AIMessageChunk
+from src.llm.core.llm import TheryLLM, content_text
+
+
+class ChunkedModel:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def astream(self, prompt):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def stream(chunks):
+    llm = TheryLLM.__new__(TheryLLM)
+    llm._session_active = True
+    llm.logger = mock.MagicMock()
+    llm.llm = ChunkedModel(chunks)
+
+    async def collect():
+        return [text async for text in llm.astream("prompt")]
+
+    return asyncio.run(collect())
+
+
+def test_astream_flattens_list_content_chunks():
+    texts = stream([
+        AIMessageChunk(content="I hear "),
+        AIMessageChunk(content=[{"type": "text", "text": "you, "}, "and that "]),
+        AIMessageChunk(content=[{"type": "text", "text": "sounds hard."}]),
+    ])
+    assert "".join(texts) == "I hear you, and that sounds hard."
+
+
+def test_content_text_skips_non_text_blocks():
+    assert content_text([{"type": "image_url", "image_url": "x"}, {"type": "text", "text": "ok"}]) == "ok"
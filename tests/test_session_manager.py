@@ -0,0 +1,36 @@
+import asyncio
+from unittest import mock
+import pytest
+
+pytest.importorskip("redis")
+
+from src.llm.memory import session_manager as session_manager_module
+from src.llm.memory.session_manager import SessionManager
+
+
+@pytest.fixture
+def connection():
+    connection = mock.MagicMock()
+    connection.client.register_script.return_value = mock.MagicMock(return_value="user-1")
+    connection.async_client.register_script.return_value = mock.AsyncMock(return_value="user-1")
+    with mock.patch.object(session_manager_module, "RedisConnection", return_value=connection):
+        yield connection
+
+
+def test_validate_session_is_one_round_trip(connection):
+    manager = SessionManager()
+    connection.client.reset_mock(return_value=False)
+
+    assert manager.validate_session("session-1") == "user-1"
+    # The script is the only command; nothing else reaches the client
+    assert manager._validate_session.call_count == 1
+    assert [name for name, _, _ in connection.client.mock_calls] == ["register_script()"]
+
+
+def test_validate_session_async_is_one_round_trip(connection):
+    manager = SessionManager()
+    connection.async_client.reset_mock(return_value=False)
+
+    assert asyncio.run(manager.validate_session_async("session-1")) == "user-1"
+    assert manager._validate_session_async.await_count == 1
+    assert [name for name, _, _ in connection.async_client.mock_calls] == ["register_script()"]